@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Context Manager — Cross-File Duplicate Elision.
+
+Bundles many files for LLM context and replaces blocks already seen
+earlier in the batch with back-references like [same as api/users.py:L10-L40].
+Blocks come from content-defined chunking (a rolling hash over lines), so a
+repeated block is found wherever it sits in each file.
+
+Usage:
+    python dedupe.py src/controllers/ "tests/**/*.py"
+    python dedupe.py src/routes/ --min-chunk 128 -o .agent/cache/routes.txt
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from minify import collect_files  # noqa: E402
+
+MIN_CHUNK = 256          # chars; smaller chunks cost about as much as a reference
+MAX_CHUNK_FACTOR = 16    # force a boundary at MIN_CHUNK * this
+BOUNDARY_MASK = 0x7      # boundary where the rolling hash's low bits are zero: ~1 line in 8
+
+
+def chunk_lines(lines, min_chunk=MIN_CHUNK):
+    """Content-defined chunks of lines: [(start, end)] index ranges.
+
+    A gear-style rolling hash over per-line crc32s decides boundaries, so
+    they depend only on the last few lines and two files sharing a block
+    re-synchronise on it. A chunk is at least min_chunk chars (except a
+    file's last one) and at most MAX_CHUNK_FACTOR times that.
+    """
+    chunks = []
+    start, size, rolling = 0, 0, 0
+    max_chunk = min_chunk * MAX_CHUNK_FACTOR
+    for i, line in enumerate(lines):
+        rolling = ((rolling << 1) + zlib.crc32(line.encode('utf-8', 'surrogatepass'))) & 0xFFFFFFFF
+        size += len(line) + 1
+        if size >= max_chunk or (size >= min_chunk and rolling & BOUNDARY_MASK == 0):
+            chunks.append((start, i + 1))
+            start, size = i + 1, 0
+    if start < len(lines):
+        chunks.append((start, len(lines)))
+    return chunks
+
+
+def dedupe(documents, min_chunk=MIN_CHUNK):
+    """Elide repeated chunks across documents.
+
+    documents is [(name, text)] in output order; the first occurrence of a
+    chunk is kept and later ones become `[same as name:L<a>-L<b>]` (line
+    numbers of the kept copy; consecutive references are merged). Returns
+    ([(name, text)], stats dict). Linear in the total size of the batch.
+    """
+    seen = {}       # chunk digest -> (name, first line, last line)
+    results = []
+    stats = {"files": 0, "chunks": 0, "elided": 0, "before": 0, "after": 0}
+
+    for name, text in documents:
+        lines = [line.rstrip() for line in text.split('\n')]
+        while lines and not lines[-1]:
+            lines.pop()
+        out = []
+        last_ref = None     # [indent, name, first, last] of the reference just emitted
+        for start, end in chunk_lines(lines, min_chunk):
+            block = "\n".join(lines[start:end])
+            stats["chunks"] += 1
+            digest = hashlib.sha1(block.encode('utf-8', 'surrogatepass')).digest()
+            origin = seen.get(digest)
+            if origin is None or len(block) < min_chunk:
+                seen.setdefault(digest, (name, start + 1, end))
+                out.append(block)
+                last_ref = None
+                continue
+
+            stats["elided"] += 1
+            if last_ref and last_ref[1] == origin[0] and last_ref[3] + 1 == origin[1]:
+                last_ref[3] = origin[2]
+            else:
+                indent = block[:len(block) - len(block.lstrip())].split('\n')[-1]
+                last_ref = [indent, origin[0], origin[1], origin[2]]
+                out.append(last_ref)
+
+        rendered = "\n".join(item if isinstance(item, str) else f"{item[0]}[same as {item[1]}:L{item[2]}-L{item[3]}]"
+                             for item in out)
+        results.append((name, rendered + "\n" if rendered else ""))
+        stats["files"] += 1
+        stats["before"] += len(text)
+        stats["after"] += len(rendered) + 1
+    return results, stats
+
+
+def print_stats(stats):
+    saved = stats["before"] - stats["after"]
+    percent = saved / stats["before"] * 100 if stats["before"] else 0
+    print(f"♻️  Elided {stats['elided']} of {stats['chunks']} chunk(s) across {stats['files']} file(s): "
+          f"{stats['before']:,} -> {stats['after']:,} chars (Saved {percent:.1f}%)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle files for LLM context, eliding repeated blocks")
+    parser.add_argument("targets", nargs="+", metavar="file|dir|glob", help="Files, directories or glob patterns")
+    parser.add_argument("--min-chunk", type=int, default=MIN_CHUNK,
+                        help=f"Smallest block (chars) worth a back-reference (default: {MIN_CHUNK})")
+    parser.add_argument("--output", "-o", help="Write the bundle here instead of stdout")
+    args = parser.parse_args()
+
+    documents = []
+    for path, rel in collect_files(args.targets):
+        try:
+            documents.append((rel, path.read_text(encoding='utf-8')))
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"⚠️  Skipped {rel}: {e}", file=sys.stderr)
+
+    results, stats = dedupe(documents, max(args.min_chunk, 1))
+    bundle = "".join(f"📄 {name}\n{text}" for name, text in results)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(bundle)
+        print(f"💾 Bundle saved to {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(bundle)
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
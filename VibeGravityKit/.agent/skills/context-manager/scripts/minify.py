@@ -3,80 +3,970 @@
 Context Manager — Minify code for LLM Context.
 
 Usage:
-    python minify.py <file_path> [--remove-comments] [--remove-empty-lines]
+    python minify.py <file_path> [--no-comments] [--no-empty] [--keep-docstrings] [--collapse-ws]
+    python minify.py <file_path> --skeleton
+    python minify.py <file_path> --expand L120-L164
+    python minify.py <dir|glob> [...] [--out .agent/cache/min/] [--jobs N]
 """
 
 import argparse
+import ast
+import bisect
+import glob
+import hashlib
+import json
+import os
 import re
 import sys
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def remove_comments_python(source):
-    # Remove single line comments
-    source = re.sub(r'#.*', '', source)
-    # Remove docstrings (simple approximation, not perfect)
-    # source = re.sub(r'""".*?"""', '', source, flags=re.DOTALL) 
-    # source = re.sub(r"'''.*?'''", '', source, flags=re.DOTALL)
-    # Docstring removal via regex is dangerous, skipping for safety
-    return source
-
-def remove_comments_js(source):
-    # Remove // comments
-    source = re.sub(r'//.*', '', source)
-    # Remove /* */ comments
-    source = re.sub(r'/\*.*?\*/', '', source, flags=re.DOTALL)
-    return source
-
-def minify_file(file_path, remove_comments=True, remove_empty=True):
-    path = Path(file_path)
-    if not path.exists():
-        print(f"Error: File {file_path} not found.")
+PYTHON_SUFFIXES = ['.py', '.pyw', '.pyi']
+
+# Batch mode: minified copies + manifest.json under this directory
+DEFAULT_OUT = os.path.join(".agent", "cache", "min")
+MANIFEST_NAME = "manifest.json"
+# Bump when minifier output changes, so cached copies are redone
+MINIFY_VERSION = 2
+IGNORED_DIRS = {
+    "node_modules", ".git", "__pycache__", "dist", "build", "venv", ".venv", "env", ".idea", ".vscode", ".agent",
+}
+
+# Tokens that never start or continue a statement's code
+_LAYOUT = (tokenize.NL, tokenize.COMMENT)
+_STATEMENT_START = (None, tokenize.ENCODING, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT)
+
+
+def _is_literal(string):
+    """A STRING token with no f-prefix (evaluating it has no side effects)"""
+    prefix = string[:min(i for i in (string.find('"'), string.find("'")) if i >= 0)]
+    return 'f' not in prefix.lower()
+
+
+def minify_python(readline, remove_comments=True, remove_docstrings=True, remove_empty=True):
+    """Yield minified Python source line by line, driven by the tokenize module.
+
+    Comments are dropped as COMMENT tokens, so a '#' inside a string is never
+    touched. A docstring is any statement made of string literals only
+    (module, class and function docstrings, plus bare string statements); a
+    block left empty by removing it gets a 'pass'. Everything between kept
+    tokens is copied from the source, so indentation, line continuations and
+    string contents are preserved exactly. Only the lines of the current
+    statement are held in memory. If the source cannot be tokenized, the rest
+    of it is passed through unchanged.
+    """
+    lines = {}
+    pos = {"row": 1}
+
+    def reader():
+        line = readline()
+        if line:
+            lines[pos["row"]] = line
+            pos["row"] += 1
+        return line
+
+    def gap(start, end):
+        # Source text between two (row, col) positions
+        (srow, scol), (erow, ecol) = start, end
+        if srow == erow:
+            return lines.get(srow, "")[scol:ecol]
+        parts = [lines.get(srow, "")[scol:]]
+        parts.extend(lines.get(row, "") for row in range(srow + 1, erow))
+        parts.append(lines.get(erow, "")[:ecol])
+        return "".join(parts)
+
+    out = []            # text of the output line being built
+    last = (1, 0)       # end of the last consumed token
+    prev = None         # type of the last significant kept token
+    blocks = [["", True]]  # [indent, has_statement] per open block
+    pending = []        # tokens of a possible docstring statement
+
+    def finish_line():
+        text = "".join(out).rstrip()
+        out.clear()
+        for row in [row for row in lines if row < last[0]]:
+            del lines[row]
+        if text or not remove_empty:
+            return text + "\n"
+        return None
+
+    def emit(tok):
+        nonlocal last, prev
+        if tok.type == tokenize.COMMENT and remove_comments:
+            last = tok.end
+            return None
+        out.append(gap(last, tok.start))
+        out.append(tok.string)
+        last = tok.end
+        if tok.type not in _LAYOUT:
+            prev = tok.type
+            if tok.type not in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
+                blocks[-1][1] = True
+        if tok.type in (tokenize.NEWLINE, tokenize.NL):
+            return finish_line()
+        return None
+
+    try:
+        for tok in tokenize.generate_tokens(reader):
+            if pending:
+                if (tok.type == tokenize.STRING and _is_literal(tok.string)) or tok.type in _LAYOUT:
+                    pending.append(tok)
+                    continue
+                if tok.type == tokenize.NEWLINE:
+                    # A statement of string literals only: drop it with its line
+                    pending.clear()
+                    out.clear()
+                    last, prev = tok.end, tokenize.NEWLINE
+                    continue
+                for held in pending:
+                    line = emit(held)
+                    if line is not None:
+                        yield line
+                pending.clear()
+
+            if (tok.type == tokenize.STRING and remove_docstrings and prev in _STATEMENT_START
+                    and _is_literal(tok.string)):
+                pending.append(tok)
+                continue
+            if tok.type == tokenize.INDENT:
+                blocks.append([tok.string, False])
+            elif tok.type == tokenize.DEDENT:
+                indent, filled = blocks.pop()
+                if not filled:
+                    yield indent + "pass\n"
+                    blocks[-1][1] = True
+            elif tok.type == tokenize.ENDMARKER:
+                text = "".join(out).rstrip()
+                if text:
+                    yield text + "\n"
+                return
+            line = emit(tok)
+            if line is not None:
+                yield line
+    except (tokenize.TokenError, SyntaxError):
+        # Not valid Python: pass the unconsumed source through untouched
+        text = "".join(out) + gap(last, (pos["row"], 0))
+        if text:
+            yield text
+        while True:
+            line = readline()
+            if not line:
+                break
+            yield line
+
+
+# ---------- C-family / JS / CSS lexer ----------
+
+# Language family per suffix; each family knows its comment and literal syntax
+LEXER_FAMILIES = {
+    '.js': 'js', '.mjs': 'js', '.cjs': 'js', '.jsx': 'js', '.ts': 'js', '.tsx': 'js', '.mts': 'js', '.cts': 'js',
+    '.java': 'c', '.kt': 'c', '.kts': 'c', '.swift': 'c', '.cs': 'c', '.scala': 'c', '.dart': 'c',
+    '.c': 'c', '.h': 'c', '.cpp': 'c', '.cc': 'c', '.cxx': 'c', '.hpp': 'c', '.hh': 'c',
+    '.go': 'go',
+    '.css': 'css', '.scss': 'scss', '.less': 'scss',
+}
+
+# Characters that may open a comment or a literal, per family
+_SPECIAL = {
+    'js': re.compile(r"[\"'`/{}]"),
+    'c': re.compile(r"[\"'/]"),
+    'go': re.compile(r"[\"'`/]"),
+    'css': re.compile(r"[\"'/]"),
+    'scss': re.compile(r"[\"'/]"),
+}
+_LINE_COMMENTS = ('js', 'c', 'go', 'scss')
+# After these keywords a '/' starts a regex literal, not a division
+_REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+    'case', 'do', 'else', 'yield', 'await',
+}
+_TRAILING_WORD = re.compile(r"[\w$]+$")
+_CPP_RAW_PREFIX = re.compile(r"(?:^|[^\w])(?:u8|[uUL])?R$")
+_OPEN_URL = re.compile(r"url\([^)\"']*$", re.IGNORECASE)
+# JSX is recognised in these files: '<' where an expression starts opens an element
+JSX_SUFFIXES = ('.js', '.jsx', '.tsx')
+_SPECIAL_JSX = re.compile(r"[\"'`/{}<]")
+_JSX_TAG = re.compile(r"<(/?)\s*([A-Za-z_$][\w$.:-]*)?")
+# Last significant characters after which '<' can open a nested JSX element
+_JSX_BEFORE = '({[,=?:&|!>"'
+
+
+def _scan_quoted(source, start, quote):
+    """End of a quoted literal opened at start (after the closing quote), or
+    -1 when a raw newline or EOF comes first (not a literal after all)"""
+    i = start + 1
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c == '\\':
+            i += 2
+        elif c == quote:
+            return i + 1
+        elif c == '\n':
+            return -1
+        else:
+            i += 1
+    return -1
+
+
+def _scan_regex(source, start):
+    """End of a JS regex literal opened at start (flags included), or -1"""
+    i = start + 1
+    n = len(source)
+    in_class = False
+    while i < n:
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            return -1
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < n and (source[i].isalnum() or source[i] in '_$'):
+                i += 1
+            return i
+        i += 1
+    return -1
+
+
+def _scan_template(source, start):
+    """Scan template-literal text from start up to its closing backtick or
+    the next '${'. Returns (end, opens_expression)."""
+    i = start
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            return i + 1, False
+        elif c == '$' and source.startswith('${', i):
+            return i + 2, True
+        else:
+            i += 1
+    return n, False
+
+
+def _scan_jsx_expression(source, start):
+    """End of a JSX {...} expression opened at start (after the closing
+    brace), or -1. Strings, templates, comments and nested JSX are skipped."""
+    depth = 0
+    i = start
+    n = len(source)
+    sig = '{'
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            end = _scan_quoted(source, i, c)
+        elif c == '`':
+            end, opens = _scan_template(source, i + 1)
+            while opens and end != -1:
+                end = _scan_jsx_expression(source, end - 1)
+                if end != -1:
+                    end, opens = _scan_template(source, end)
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = end if end == -1 else end + 2
+        elif c == '<' and sig in _JSX_BEFORE:
+            end = _scan_jsx(source, i)
+            end = i + 1 if end == -1 else end
+        else:
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            if not c.isspace():
+                sig = c
+            i += 1
+            continue
+        if end == -1:
+            return -1
+        sig = '"'
+        i = end
+    return -1
+
+
+def _scan_jsx(source, start):
+    """End of the JSX element or fragment opened by the '<' at start, or -1
+    when it is not well-formed JSX (a comparison, a TypeScript generic)"""
+    names = []
+    i = start
+    n = len(source)
+    while True:
+        tag = _JSX_TAG.match(source, i)
+        closing, name = tag.group(1), tag.group(2) or ''
+        if closing and (not names or names.pop() != name):
+            return -1
+        i = tag.end()
+        if not name and not source.startswith('>', i):
+            return -1
+        while i < n and source[i] not in '>/':
+            c = source[i]
+            if closing and not c.isspace():
+                return -1
+            if c in '"\'':
+                # Attribute strings have no escapes and may span lines
+                i = source.find(c, i + 1)
+                if i == -1:
+                    return -1
+                i += 1
+            elif c == '{':
+                i = _scan_jsx_expression(source, i)
+                if i == -1:
+                    return -1
+            elif c.isalnum() or c in '_$-:.=' or c.isspace():
+                i += 1
+            else:
+                return -1
+        if source.startswith('/>', i) and not closing:
+            i += 2
+        elif source.startswith('>', i):
+            i += 1
+            if not closing:
+                names.append(name)
+        else:
+            return -1
+        if not names:
+            return i
+        # Children: text up to the next tag, {expression}s in between
+        while i < n and source[i] != '<':
+            if source[i] == '{':
+                i = _scan_jsx_expression(source, i)
+                if i == -1:
+                    return -1
+            else:
+                i += 1
+        if i >= n:
+            return -1
+
+
+def _tidy_code(code, remove_empty, collapse_ws):
+    """Whitespace clean-up of code between literals (never inside them)"""
+    if collapse_ws:
+        code = re.sub(r"[ \t\f\v]+", " ", code)
+        code = re.sub(r" ?\n ?", "\n", code)
+    else:
+        code = re.sub(r"[ \t\f\v]+\n", "\n", code)
+    if remove_empty:
+        code = re.sub(r"\n(?:[ \t\f\v]*\n)+", "\n", code)
+    return code
+
+
+def _lex(source, family, jsx=False):
+    """Split C-family, JavaScript/TypeScript or CSS source into pieces in one
+    linear pass. Yields (kind, text) with kind 'code', 'comment' or
+    'literal'; the texts concatenate back to source exactly.
+
+    A small state machine walks the source from one special character to the
+    next (quotes, backticks, '/', and braces inside template expressions), so
+    string, char, template and regex literals come out whole and '//' in a
+    string or URL is never mistaken for a comment. With jsx, a JSX element
+    is one opaque literal, so its text (`<p>see http://x</p>`) is kept as is.
+    """
+    special = _SPECIAL_JSX if jsx else _SPECIAL[family]
+    sig, word = '', ''   # last significant code character / trailing identifier
+    recent = []          # code pieces since the last literal or comment
+    templates = []       # open ${ } expressions: brace depth inside each
+    n = len(source)
+    pos = 0
+
+    def code(text):
+        nonlocal sig, word
+        recent.append(text)
+        stripped = text.rstrip()
+        if stripped:
+            sig = stripped[-1]
+            match = _TRAILING_WORD.search(stripped)
+            word = match.group() if match else ''
+        return 'code', text
+
+    def literal(text):
+        nonlocal sig, word
+        recent.clear()
+        sig, word = '"', ''
+        return 'literal', text
+
+    def comment(text):
+        recent.clear()
+        return 'comment', text
+
+    while pos < n:
+        match = special.search(source, pos)
+        if match is None:
+            yield code(source[pos:])
+            break
+        i = match.start()
+        if i > pos:
+            yield code(source[pos:i])
+        c = source[i]
+        nxt = source[i + 1:i + 2]
+
+        if c == '/' and nxt == '/' and family in _LINE_COMMENTS and not (
+                family == 'scss' and _OPEN_URL.search(source, source.rfind('\n', 0, i) + 1, i)):
+            end = source.find('\n', i)
+            end = n if end == -1 else end
+            yield comment(source[i:end])
+            pos = end
+            continue
+
+        if c == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            yield comment(source[i:end])
+            pos = end
+            continue
+
+        # '/' or '<' here starts a regex or a JSX element, not an operator
+        operand = not sig or sig not in ')]"' and not (sig.isalnum() or sig in '_$') or word in _REGEX_KEYWORDS
+
+        if c == '<':
+            end = _scan_jsx(source, i) if operand else -1
+            if end == -1:
+                yield code(c)
+                pos = i + 1
+            else:
+                yield literal(source[i:end])
+                pos = end
+            continue
+
+        if c == '/':
+            regex_ok = family == 'js' and operand
+            end = _scan_regex(source, i) if regex_ok else -1
+            if end == -1:
+                yield code(c)
+                pos = i + 1
+            else:
+                yield literal(source[i:end])
+                pos = end
+            continue
+
+        if c == '`' and family == 'js':
+            end, opens = _scan_template(source, i + 1)
+            yield literal(source[i:end])
+            if opens:
+                templates.append(0)
+            pos = end
+            continue
+
+        if c == '`':
+            # Go raw string: no escapes, may span lines
+            end = source.find('`', i + 1)
+            end = n if end == -1 else end + 1
+            yield literal(source[i:end])
+            pos = end
+            continue
+
+        if c in '{}':
+            if templates and c == '}' and templates[-1] == 0:
+                # End of a ${ } expression: back to template text
+                templates.pop()
+                end, opens = _scan_template(source, i + 1)
+                yield literal(source[i:end])
+                if opens:
+                    templates.append(0)
+                pos = end
+                continue
+            if templates:
+                templates[-1] += 1 if c == '{' else -1
+            yield code(c)
+            pos = i + 1
+            continue
+
+        # Quotes
+        if c == '"' and family == 'c' and source.startswith('"""', i):
+            # Java/Kotlin/Swift text block
+            end = source.find('"""', i + 3)
+            end = n if end == -1 else end + 3
+            yield literal(source[i:end])
+            pos = end
+            continue
+        if c == '"' and family == 'c' and _CPP_RAW_PREFIX.search("".join(recent[-2:])):
+            paren = source.find('(', i)
+            delimiter = source[i + 1:paren] if paren != -1 else None
+            if delimiter is not None and len(delimiter) <= 16 and '\n' not in delimiter:
+                end = source.find(')' + delimiter + '"', paren)
+                end = n if end == -1 else end + len(delimiter) + 2
+                yield literal(source[i:end])
+                pos = end
+                continue
+        end = _scan_quoted(source, i, c)
+        if end == -1:
+            yield code(c)
+            pos = i + 1
+        else:
+            yield literal(source[i:end])
+            pos = end
+
+
+def lex_minify(source, family, remove_comments=True, remove_empty=True, collapse_ws=False, jsx=False):
+    """Minify C-family, JavaScript/TypeScript or CSS source in one linear pass.
+
+    Literals from _lex are copied verbatim. A block comment becomes a space,
+    or a newline when it spanned lines (keeping JS line breaks meaningful).
+    With collapse_ws, runs of spaces and indentation collapse too; newlines
+    are always kept.
+    """
+    out = []
+    code = []            # code since the last literal, tidied on flush
+
+    def flush():
+        if code:
+            out.append(_tidy_code("".join(code), remove_empty, collapse_ws))
+            code.clear()
+
+    for kind, text in _lex(source, family, jsx):
+        if kind == 'code':
+            code.append(text)
+        elif kind == 'comment' and remove_comments:
+            if text.startswith('/*'):
+                code.append('\n' if '\n' in text else ' ')
+        else:
+            flush()
+            out.append(text)
+
+    flush()
+    text = "".join(out).strip('\n')
+    return text + '\n' if text else ''
+
+
+# ---------- Skeleton mode (API surface only) ----------
+
+SKELETON_FAMILIES = ('js', 'c', 'go')
+# A '{' after one of these opens a block whose members are kept
+_CONTAINER = re.compile(
+    r"\b(?:class|interface|namespace|module|enum|struct|trait|extern)\b[^=();]*$|\btype\s+[\w$<>, ]+=\s*$")
+_BLOCK_CHARS = re.compile(r"[{};]")
+_BRACES = re.compile(r"[{}]")
+_SIMPLE_STATEMENTS = (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign)
+
+
+def _span(first, last):
+    return f"L{first}" if first == last else f"L{first}-L{last}"
+
+
+def _doc_line(comment):
+    """First text line of a /** ... */ comment"""
+    for line in comment[3:-2].splitlines():
+        line = line.strip().lstrip('*').strip()
+        if line:
+            return line
+    return ''
+
+
+def lex_skeleton(source, family, jsx=False):
+    """Skeleton of C-family, JavaScript/TypeScript or Go source.
+
+    Class-like blocks (class, interface, namespace, struct, ...) keep their
+    members; every other multi-line {...} block (function and method bodies,
+    object literals, top-level statements) is replaced by
+    `{ /* L<a>-L<b> */ }` naming the hidden lines. A /** doc */ comment
+    before any declaration is reduced to its first line; other comments
+    are dropped. One pass over _lex pieces plus one over the braces.
+    """
+    masked, clean, docs = [], [], {}
+    offset = 0
+    for kind, text in _lex(source, family, jsx):
+        if kind == 'code':
+            masked.append(text)
+            clean.append(text)
+        else:
+            # Same length, newlines kept: offsets and line numbers stay valid
+            blank = re.sub(r"[^\n]", " ", text)
+            masked.append(blank)
+            clean.append(text if kind == 'literal' else blank)
+            if kind == 'comment' and text.startswith('/**'):
+                docs[offset + len(text)] = _doc_line(text)
+        offset += len(text)
+    masked, clean = "".join(masked), "".join(clean)
+    newlines = [m.start() for m in re.finditer('\n', masked)]
+    doc_ends = sorted(docs)
+
+    def line_of(i):
+        return bisect.bisect_left(newlines, i) + 1
+
+    out = []
+    pos = boundary = i = 0
+
+    def emit_doc(start):
+        """Copy up to the declaration at start, preceded by its doc line"""
+        nonlocal pos
+        k = bisect.bisect_right(doc_ends, start) - 1
+        if k < 0 or doc_ends[k] < boundary or masked[doc_ends[k]:start].strip() or not docs[doc_ends[k]]:
+            return
+        linestart = max(pos, masked.rfind('\n', 0, start) + 1)
+        indent = re.match(r"[ \t]*", clean[linestart:start]).group()
+        out.append(clean[pos:linestart])
+        out.append(f"{indent}/** {docs[doc_ends[k]]} */\n")
+        pos = linestart
+
+    while True:
+        match = _BLOCK_CHARS.search(masked, i)
+        if match is None:
+            break
+        p = match.start()
+        header = masked[boundary:p]
+        start = p - len(header.lstrip())
+        if header.strip():
+            # Every declaration that is emitted keeps its doc line
+            emit_doc(start)
+        if masked[p] != '{' or _CONTAINER.search(header):
+            boundary = i = p + 1
+            continue
+
+        depth, q = 0, len(masked)
+        for brace in _BRACES.finditer(masked, p):
+            depth += 1 if brace.group() == '{' else -1
+            if depth == 0:
+                q = brace.start()
+                break
+        body = masked[p + 1:q]
+        if '\n' in body.strip():
+            first = p + 1 + len(body) - len(body.lstrip())
+            last = p + len(body.rstrip())
+            out.append(clean[pos:p + 1])
+            out.append(f" /* {_span(line_of(first), line_of(last))} */ }}")
+            pos = q + 1
+        boundary = i = q + 1
+
+    out.append(clean[pos:])
+    lines = [line.rstrip() for line in "".join(out).splitlines()]
+    return "".join(line + '\n' for line in lines if line)
+
+
+def python_skeleton(source):
+    """Skeleton of Python source, parsed with ast.
+
+    Keeps class and function signatures (decorators included), the first
+    line of each docstring, and single-line imports/assignments at module
+    and class level. Everything else becomes `...  # L<a>-L<b>`, naming the
+    hidden lines, so the skeleton is itself valid Python.
+    """
+    tree = ast.parse(source)
+    lines = source.split('\n')
+    out = []
+
+    def first_line(node):
+        return min([d.lineno for d in getattr(node, 'decorator_list', [])] + [node.lineno])
+
+    def indent_of(node):
+        return lines[node.lineno - 1][:node.col_offset]
+
+    def docstring(body):
+        """(first docstring line or None, remaining statements)"""
+        head = body[0]
+        if isinstance(head, ast.Expr) and isinstance(head.value, ast.Constant) and isinstance(head.value.value, str):
+            text = head.value.value.strip().split('\n')[0].strip()
+            if text:
+                quote = "'''" if '"' in text else '"""'
+                return f"{indent_of(head)}{quote}{text}{quote}", body[1:]
+        return None, body
+
+    def visit(body):
+        gap = None
+        for node in body:
+            is_def = isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            if not is_def and not (isinstance(node, _SIMPLE_STATEMENTS) and node.lineno == node.end_lineno):
+                gap = (gap or (indent_of(node), first_line(node)))[:2] + (node.end_lineno,)
+                continue
+            if gap:
+                out.append(f"{gap[0]}...  # {_span(gap[1], gap[2])}")
+                gap = None
+            if not is_def:
+                out.append(lines[node.lineno - 1].rstrip())
+                continue
+
+            start = first_line(node)
+            if node.body[0].lineno == node.lineno:
+                # One-liner: def f(): return x
+                out.extend(line.rstrip() for line in lines[start - 1:node.end_lineno])
+                continue
+            header = lines[start - 1:first_line(node.body[0]) - 1]
+            out.extend(line.rstrip() for line in header if line.strip() and not line.lstrip().startswith('#'))
+            doc, rest = docstring(node.body)
+            if doc:
+                out.append(doc)
+            if isinstance(node, ast.ClassDef):
+                visit(rest)
+            elif rest:
+                out.append(f"{indent_of(rest[0])}...  # {_span(first_line(rest[0]), node.end_lineno)}")
+        if gap:
+            out.append(f"{gap[0]}...  # {_span(gap[1], gap[2])}")
+
+    if tree.body:
+        doc, rest = docstring(tree.body)
+        if doc:
+            out.append(doc)
+        visit(rest)
+    return "".join(line + '\n' for line in out)
+
+
+def render_skeleton(path):
+    """Skeleton text of a file, or None when its language has no skeleton
+    support or it does not parse"""
+    if path.suffix in PYTHON_SUFFIXES:
+        with tokenize.open(path) as f:
+            source = f.read()
+        try:
+            return python_skeleton(source)
+        except SyntaxError as e:
+            print(f"⚠️  {path}: {e.msg} (line {e.lineno}); minifying instead of a skeleton", file=sys.stderr)
+            return None
+    family = LEXER_FAMILIES.get(path.suffix.lower())
+    if family in SKELETON_FAMILIES:
+        with open(path, 'r', encoding='utf-8') as f:
+            return lex_skeleton(f.read(), family, path.suffix.lower() in JSX_SUFFIXES)
+    return None
+
+
+def expand_lines(file_path, spec):
+    """Print the source lines a skeleton marker names ('L12-L40' or '12-40')"""
+    match = re.fullmatch(r"L?(\d+)(?:-L?(\d+))?", spec.strip())
+    if not match:
+        print(f"Error: bad line range '{spec}' (expected L12-L40)")
         sys.exit(1)
+    first = int(match.group(1))
+    last = int(match.group(2) or first)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if number > last:
+                break
+            if number >= first:
+                sys.stdout.write(line)
+
+
+def minify_lines(path, remove_comments=True, remove_empty=True, remove_docstrings=True, collapse_ws=False,
+                 skeleton=False):
+    """Yield the minified lines of a file (its skeleton, with skeleton=True
+    and a supported language)"""
+    if skeleton:
+        text = render_skeleton(path)
+        if text is not None:
+            yield from text.splitlines(keepends=True)
+            return
+
+    if path.suffix in PYTHON_SUFFIXES:
+        # tokenize.open honours PEP 263 encoding cookies
+        with tokenize.open(path) as f:
+            yield from minify_python(f.readline, remove_comments, remove_docstrings, remove_empty)
+        return
 
     with open(path, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    original_len = len(content)
-
-    if remove_comments:
-        if path.suffix in ['.py']:
-            content = remove_comments_python(content)
-        elif path.suffix in ['.js', '.ts', '.jsx', '.tsx', '.css', '.java', '.c', '.cpp']:
-            content = remove_comments_js(content)
-    
-    lines = content.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if remove_empty and not stripped:
+    family = LEXER_FAMILIES.get(path.suffix.lower())
+    if family:
+        text = lex_minify(content, family, remove_comments, remove_empty, collapse_ws,
+                          jsx=path.suffix.lower() in JSX_SUFFIXES)
+        yield from text.splitlines(keepends=True)
+        return
+
+    for line in content.split('\n'):
+        if remove_empty and not line.strip():
             continue
-        # Preserve indentation but maybe reduce it? For now, keep indentation logic simple
-        # Just creating a "dense" version
-        cleaned_lines.append(line) # Keep indentation for readability/python correctness
+        yield line + '\n'
 
-    final_content = "\n".join(cleaned_lines)
-    
-    # Remove multi-line empty blocks again just in case
-    if remove_empty:
-        final_content = re.sub(r'\n\s*\n', '\n', final_content)
 
-    new_len = len(final_content)
-    saved = original_len - new_len
-    percent = (saved / original_len) * 100 if original_len > 0 else 0
+def minify_file(file_path, remove_comments=True, remove_empty=True, remove_docstrings=True, collapse_ws=False,
+                skeleton=False):
+    path = Path(file_path)
+    if not path.exists():
+        print(f"Error: File {file_path} not found.")
+        sys.exit(1)
 
-    print(f"📉 Minified {path.name}: {original_len} -> {new_len} chars (Saved {percent:.1f}%)")
+    original_len = len(path.read_bytes().decode('utf-8', errors='replace'))
+    new_len = 0
+
+    # Lines are printed as they are produced, so the stats come last
     print("-" * 40)
-    print(final_content)
+    for line in minify_lines(path, remove_comments, remove_empty, remove_docstrings, collapse_ws, skeleton):
+        sys.stdout.write(line)
+        new_len += len(line)
     print("-" * 40)
 
+    saved = original_len - new_len
+    percent = (saved / original_len) * 100 if original_len > 0 else 0
+    print(f"📉 Minified {path.name}: {original_len} -> {new_len} chars (Saved {percent:.1f}%)")
+
+
+# ---------- Batch mode (directories / globs) ----------
+
+def collect_files(targets):
+    """(path, output name) of the files named by targets: files, directories
+    (walked for known code suffixes) and glob patterns (every matching file).
+    Names are paths from the cwd, or from the target's parent directory for
+    targets outside it."""
+    suffixes = set(PYTHON_SUFFIXES) | set(LEXER_FAMILIES)
+    found = {}
+    for target in targets:
+        if glob.has_magic(target):
+            root = os.path.dirname(target[:min(target.find(c) for c in "*?[" if c in target)])
+            paths = [Path(p) for p in sorted(glob.glob(target, recursive=True)) if os.path.isfile(p)]
+        elif os.path.isdir(target):
+            root = os.path.dirname(os.path.abspath(target))
+            paths = []
+            for dirpath, dirnames, filenames in os.walk(target):
+                dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS)
+                paths.extend(Path(dirpath) / name for name in sorted(filenames)
+                             if Path(name).suffix.lower() in suffixes)
+        elif os.path.isfile(target):
+            root = os.path.dirname(os.path.abspath(target))
+            paths = [Path(target)]
+        else:
+            continue
+        for path in paths:
+            rel = os.path.relpath(path)
+            if rel.startswith(".."):
+                rel = os.path.relpath(path, root or ".")
+            found.setdefault(path, Path(rel).as_posix())
+    return list(found.items())
+
+
+def _minify_job(job):
+    """Worker: minify one source into dest. Returns (rel, before, after, error)"""
+    rel, source, dest, options = job
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    try:
+        before = len(Path(source).read_bytes().decode('utf-8', errors='replace'))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        after = 0
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for line in minify_lines(Path(source), **options):
+                f.write(line)
+                after += len(line)
+        os.replace(tmp, dest)
+        return rel, before, after, None
+    except (OSError, UnicodeDecodeError, SyntaxError) as e:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return rel, 0, 0, str(e)
+
+
+def minify_tree(targets, out_dir=DEFAULT_OUT, jobs=None, **options):
+    """Minify many files into out_dir, mirroring their relative paths.
+
+    A file is redone only when its sha1 (or the minifier options/version)
+    differs from the one recorded in out_dir/manifest.json; misses run on a
+    process pool. The manifest keeps per-file sizes before/after.
+    Returns the manifest.
+    """
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    signature = {"version": MINIFY_VERSION, **options}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = {}
+    if manifest.get("options") != signature:
+        manifest = {"options": signature, "files": {}}
+    entries = manifest["files"]
+
+    todo, cached, failed = [], 0, []
+    for path, rel in collect_files(targets):
+        try:
+            digest = hashlib.sha1(path.read_bytes()).hexdigest()
+        except OSError as e:
+            failed.append((rel, str(e)))
+            continue
+        # Absolute, so a run from another directory still finds the source
+        source = str(path.resolve())
+        dest = os.path.join(out_dir, rel)
+        entry = entries.get(rel)
+        if entry and entry["sha1"] == digest and os.path.exists(dest):
+            entry["source"] = source
+            cached += 1
+            continue
+        entries[rel] = {"source": source, "sha1": digest}
+        todo.append((rel, str(path), dest, options))
+
+    workers = jobs or os.cpu_count() or 1
+    if len(todo) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            results = list(pool.map(_minify_job, todo, chunksize=max(1, len(todo) // (workers * 4))))
+    else:
+        results = [_minify_job(job) for job in todo]
+
+    for rel, before, after, error in results:
+        if error:
+            failed.append((rel, error))
+            entries.pop(rel, None)
+        else:
+            entries[rel].update(before=before, after=after)
+
+    # Forget sources that no longer exist
+    for rel in [rel for rel, entry in entries.items() if not os.path.exists(entry["source"])]:
+        del entries[rel]
+        try:
+            os.remove(os.path.join(out_dir, rel))
+        except OSError:
+            pass
+
+    manifest["totals"] = {
+        "files": len(entries),
+        "before": sum(entry["before"] for entry in entries.values()),
+        "after": sum(entry["after"] for entry in entries.values()),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    manifest["run"] = {"minified": len(results) - len(failed), "cached": cached, "failed": failed}
+    return manifest
+
+
+def print_tree_summary(manifest, out_dir):
+    run, totals = manifest["run"], manifest["totals"]
+    before, after = totals["before"], totals["after"]
+    percent = (before - after) / before * 100 if before else 0
+    print(f"📦 Minified {run['minified']} file(s), {run['cached']} unchanged from cache -> {out_dir}")
+    print(f"📉 {totals['files']} file(s): {before:,} -> {after:,} chars (Saved {percent:.1f}%)")
+    for rel, error in run["failed"]:
+        print(f"⚠️  Skipped {rel}: {error}")
+    print(f"🗂️  Manifest: {os.path.join(out_dir, MANIFEST_NAME)}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Minify code for LLM context")
-    parser.add_argument("file", help="File to minify")
+    parser.add_argument("targets", nargs="+", metavar="file|dir|glob",
+                        help="File to minify (printed), or directories/globs to minify into --out")
+    parser.add_argument("--out", help=f"Batch output directory (default: {DEFAULT_OUT})")
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes for batch mode (default: CPU count)")
     parser.add_argument("--no-comments", action="store_false", dest="remove_comments", help="Keep comments")
     parser.add_argument("--no-empty", action="store_false", dest="remove_empty", help="Keep empty lines")
-    
+    parser.add_argument("--keep-docstrings", action="store_false", dest="remove_docstrings",
+                        help="Keep Python docstrings")
+    parser.add_argument("--collapse-ws", action="store_true",
+                        help="Also collapse runs of spaces and indentation (C-family/JS/CSS only)")
+    parser.add_argument("--skeleton", action="store_true",
+                        help="Signatures and docstring first lines only; bodies become L<a>-L<b> markers")
+    parser.add_argument("--expand", metavar="L<a>-L<b>", help="Print these source lines of a file (from a skeleton marker)")
+
     args = parser.parse_args()
-    minify_file(args.file, args.remove_comments, args.remove_empty)
+    single = len(args.targets) == 1 and not glob.has_magic(args.targets[0]) and not os.path.isdir(args.targets[0])
+    if single and not args.out:
+        if args.expand:
+            expand_lines(args.targets[0], args.expand)
+            return
+        minify_file(args.targets[0], args.remove_comments, args.remove_empty, args.remove_docstrings, args.collapse_ws,
+                    args.skeleton)
+        return
+
+    out_dir = args.out or DEFAULT_OUT
+    manifest = minify_tree(args.targets, out_dir, args.jobs, remove_comments=args.remove_comments,
+                           remove_empty=args.remove_empty, remove_docstrings=args.remove_docstrings,
+                           collapse_ws=args.collapse_ws, skeleton=args.skeleton)
+    print_tree_summary(manifest, out_dir)
 
 if __name__ == "__main__":
     main()
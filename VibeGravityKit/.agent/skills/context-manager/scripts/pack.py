@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Context Manager — Token-Budget Context Packer.
+
+Ranks files and symbols for a task (codebase-navigator index + recent git
+changes) and packs the most useful mix of full bodies, focused symbols,
+signatures and outlines that fits a token budget.
+
+Usage:
+    python pack.py "fix login redirect" --budget 8000
+    python pack.py "payment webhook" --budget 4000 --root ./src -o .agent/cache/pack.md
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+sys.path.insert(0, str(SCRIPT_DIR.parent.parent / "codebase-navigator" / "scripts"))
+
+from minify import collect_files, minify_lines, render_skeleton  # noqa: E402
+from navigator import INDEX_FILE, load_index  # noqa: E402
+
+CHARS_PER_TOKEN = 4
+DEFAULT_BUDGET = 8000
+MAX_CANDIDATES = 200
+RECENT_COMMITS = 20
+
+# Share of a file's relevance each rendering delivers, cheapest first
+LEVELS = [("outline", 0.15), ("signatures", 0.4), ("skeleton", 0.55), ("focus", 0.75), ("full", 1.0)]
+ICONS = {"outline": "🧭", "signatures": "📑", "skeleton": "🦴", "focus": "🎯", "full": "📄"}
+
+PATH_WEIGHT = 3
+NAME_WEIGHT = 2
+SIGNATURE_WEIGHT = 1
+SYMBOL_CAP = 10
+WORKTREE_BOOST = 4
+RECENT_BOOST = 2
+
+STOPWORDS = {"the", "a", "an", "and", "or", "to", "of", "in", "on", "for", "with", "is", "it"}
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def query_terms(query):
+    return [t for t in re.findall(r"[a-z0-9]+", query.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+# ---------- Candidates ----------
+
+def _git(root, *args):
+    try:
+        result = subprocess.run(["git", "-C", str(root)] + list(args), capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def git_activity(root, commits=RECENT_COMMITS):
+    """{absolute path: boost} for uncommitted changes and files touched by
+    the last `commits` commits (newer commits weigh more)"""
+    top = _git(root, "rev-parse", "--show-toplevel")
+    if not top:
+        return {}
+    top = Path(top.strip())
+    boosts, age = {}, -1
+
+    for line in (_git(root, "log", f"-n{commits}", "--name-only", "--format=@@") or "").splitlines():
+        if line == "@@":
+            age += 1
+        elif line:
+            path = str((top / line).resolve())
+            boosts.setdefault(path, RECENT_BOOST * (commits - age) / commits)
+
+    for line in (_git(root, "status", "--porcelain") or "").splitlines():
+        name = line[3:].split(" -> ")[-1].strip('"')
+        boosts[str((top / name).resolve())] = WORKTREE_BOOST
+    return boosts
+
+
+def _walk_candidates(root):
+    return [(Path(path), rel, []) for path, rel in collect_files([str(root)])]
+
+
+def load_candidates(root):
+    """[(path, rel, symbols)] from the navigator index, or every code file
+    under root (without symbols) when nothing under root is indexed.
+
+    A file modified since it was indexed keeps its place but loses its
+    symbols: their line numbers no longer point at the right code, so it
+    falls back to outline/skeleton/full renderings."""
+    index = load_index()
+    files = index.get("files", {})
+    if not files:
+        print(f"⚠️  No navigator index at {INDEX_FILE}; ranking by path only "
+              "(run navigator.py --action index for symbol-level packing)", file=sys.stderr)
+        return _walk_candidates(root)
+
+    indexed_at = index.get("metadata", {})
+    candidates, stale = [], 0
+    for key, symbols in files.items():
+        rel = key.replace("\\", "/")
+        path = root / rel
+        if not path.is_file():
+            continue
+        if path.stat().st_mtime > indexed_at.get(key, 0):
+            symbols = []
+            stale += 1
+        candidates.append((path, rel, symbols))
+
+    if not candidates:
+        print(f"⚠️  None of the {len(files)} indexed files exist under {root}; ranking by path only "
+              "(re-run navigator.py --action index from this root)", file=sys.stderr)
+        return _walk_candidates(root)
+    if stale:
+        print(f"⚠️  {stale} of {len(candidates)} indexed file(s) changed since indexing; their symbols "
+              "are ignored (re-run navigator.py --action index --incremental)", file=sys.stderr)
+    return candidates
+
+
+def score_candidates(candidates, terms, boosts):
+    """Rank candidates: [(score, path, rel, symbols, symbol scores)], best first"""
+    ranked = []
+    for path, rel, symbols in candidates:
+        rel_lower = rel.lower()
+        score = PATH_WEIGHT * sum(t in rel_lower for t in terms)
+
+        symbol_scores = []
+        for sym in symbols:
+            name = sym.get("name", "").lower()
+            signature = sym.get("signature", "").lower()
+            symbol_scores.append(NAME_WEIGHT * sum(t in name for t in terms)
+                                 + SIGNATURE_WEIGHT * sum(t in signature for t in terms))
+        score += min(sum(symbol_scores), SYMBOL_CAP)
+        score += boosts.get(str(path.resolve()), 0)
+
+        if score > 0:
+            ranked.append((score, path, rel, symbols, symbol_scores))
+
+    ranked.sort(key=lambda c: (-c[0], c[2]))
+    return ranked[:MAX_CANDIDATES]
+
+
+# ---------- Renderings ----------
+
+def _symbol_body(lines, symbols, i, python):
+    """Source lines of symbols[i], up to the next symbol (or the first
+    dedent back to its own level for Python)"""
+    start = symbols[i]["line"] - 1
+    end = symbols[i + 1]["line"] - 1 if i + 1 < len(symbols) else len(lines)
+    if python and start < len(lines):
+        indent = len(lines[start]) - len(lines[start].lstrip())
+        for j in range(start + 1, end):
+            stripped = lines[j].lstrip()
+            if stripped and not stripped.startswith('#') and len(lines[j]) - len(stripped) <= indent:
+                end = j
+                break
+    body = [line for line in lines[start:end] if line.strip()]
+    return start + 1, start + len(lines[start:end]), body
+
+
+def render_levels(path, rel, symbols, symbol_scores):
+    """{level: text} for one file; levels that add nothing are left out"""
+    raw = path.read_text(encoding="utf-8")
+    lines = raw.split('\n')
+    order = sorted(range(len(symbols)), key=lambda i: symbols[i].get("line", 0))
+    symbols = [symbols[i] for i in order]
+    symbol_scores = [symbol_scores[i] for i in order]
+
+    def header(level):
+        return f"{ICONS[level]} {rel}  [{level}]\n"
+
+    def signature(sym):
+        line = sym.get("line", 0)
+        text = sym.get("signature") or (lines[line - 1].strip() if 0 < line <= len(lines) else sym["name"])
+        return f"L{line}: {text}"
+
+    levels = {"outline": header("outline")
+              + (", ".join(f"{s['name']}:{s.get('line', '?')}" for s in symbols) or f"{len(lines)} lines") + "\n"}
+
+    if symbols:
+        levels["signatures"] = header("signatures") + "".join(signature(s) + "\n" for s in symbols)
+
+    skeleton = render_skeleton(path)
+    if skeleton:
+        levels["skeleton"] = header("skeleton") + skeleton
+
+    if any(symbol_scores):
+        python = path.suffix == ".py"
+        parts = []
+        for i, sym in enumerate(symbols):
+            if symbol_scores[i]:
+                first, last, body = _symbol_body(lines, symbols, i, python)
+                parts.append(f"L{first}-L{last}:\n" + "".join(line + "\n" for line in body))
+            else:
+                parts.append(signature(sym) + "\n")
+        levels["focus"] = header("focus") + "".join(parts)
+
+    levels["full"] = header("full") + "".join(minify_lines(path))
+    return raw, levels
+
+
+def build_options(ranked):
+    """Per file: raw token count and [(level, tokens, value, text)] with
+    strictly growing value, cheapest first"""
+    options = []
+    for score, path, rel, symbols, symbol_scores in ranked:
+        try:
+            raw, levels = render_levels(path, rel, symbols, symbol_scores)
+        except (OSError, UnicodeDecodeError, SyntaxError) as e:
+            print(f"⚠️  Skipped {rel}: {e}", file=sys.stderr)
+            continue
+        choices = [(name, estimate_tokens(levels[name]), score * share, levels[name])
+                   for name, share in LEVELS if name in levels]
+        options.append((rel, estimate_tokens(raw), choices))
+    return options
+
+
+# ---------- Budget planner ----------
+
+def plan(options, budget):
+    """Greedy multiple-choice knapsack: repeatedly apply the upgrade (one
+    file moving to a richer rendering) with the best value per extra token
+    that still fits. Returns ({rel: choice index}, tokens used)."""
+    chosen = {}
+    used = 0
+    while True:
+        best = None
+        for rel, _, choices in options:
+            current = chosen.get(rel)
+            cur_tokens, cur_value = (choices[current][1], choices[current][2]) if current is not None else (0, 0)
+            for j in range(0 if current is None else current + 1, len(choices)):
+                extra = choices[j][1] - cur_tokens
+                gain = choices[j][2] - cur_value
+                if gain <= 0 or used + extra > budget:
+                    continue
+                ratio = gain / max(extra, 1)
+                if best is None or ratio > best[0]:
+                    best = (ratio, rel, j, extra)
+        if best is None:
+            return chosen, used
+        _, rel, j, extra = best
+        chosen[rel] = j
+        used += extra
+
+
+def pack(query, budget=DEFAULT_BUDGET, root=".", commits=RECENT_COMMITS):
+    """Build the pack. Returns (text, report dict)."""
+    root = Path(root)
+    terms = query_terms(query)
+    boosts = git_activity(root, commits) if commits else {}
+    ranked = score_candidates(load_candidates(root), terms, boosts)
+    options = build_options(ranked)
+    chosen, used = plan(options, budget)
+
+    sections, counts, raw_tokens = [], {name: 0 for name, _ in LEVELS}, 0
+    for rel, raw, choices in options:
+        if rel in chosen:
+            level, _, _, text = choices[chosen[rel]]
+            sections.append(text)
+            counts[level] += 1
+            raw_tokens += raw
+
+    report = {
+        "files": len(chosen),
+        "levels": counts,
+        "used": used,
+        "budget": budget,
+        "raw": raw_tokens,
+        "left_out": len(options) - len(chosen),
+    }
+    return "\n".join(sections), report
+
+
+def print_report(query, report):
+    levels = ", ".join(f"{name} {n}" for name, n in report["levels"].items() if n)
+    saved = report["raw"] - report["used"]
+    percent = saved / report["raw"] * 100 if report["raw"] else 0
+    print(f"📦 Packed {report['files']} file(s) for '{query}' ({levels or 'nothing'}): "
+          f"~{report['used']:,} / {report['budget']:,} tokens", file=sys.stderr)
+    print(f"💰 Saved ~{max(saved, 0):,} tokens vs. reading those files raw ({percent:.0f}%)", file=sys.stderr)
+    if report["left_out"]:
+        print(f"⏭️  Left out {report['left_out']} lower-ranked file(s); raise --budget to include them",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the most relevant code for a task into a token budget")
+    parser.add_argument("query", help="Task description, e.g. 'fix login redirect'")
+    parser.add_argument("--budget", "-b", type=int, default=DEFAULT_BUDGET, help="Token budget (~4 chars/token)")
+    parser.add_argument("--root", default=".", help="Directory the navigator index was built from")
+    parser.add_argument("--commits", type=int, default=RECENT_COMMITS,
+                        help="Recent commits whose files get a boost (0 = ignore git)")
+    parser.add_argument("--output", "-o", help="Write the pack here instead of stdout")
+    args = parser.parse_args()
+
+    text, report = pack(args.query, args.budget, args.root, args.commits)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"💾 Pack saved to {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(text)
+    print_report(args.query, report)
+
+
+if __name__ == "__main__":
+    main()
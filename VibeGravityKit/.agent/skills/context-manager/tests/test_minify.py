@@ -0,0 +1,35 @@
+"""Regression tests for minify.py (run with: python -m pytest .agent/skills/context-manager/tests)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from minify import lex_minify, lex_skeleton  # noqa: E402
+
+
+def test_url_in_jsx_text_is_not_a_comment():
+    source = "const A = () => <p>see http://example.com</p>; // trailing\n"
+    assert lex_minify(source, 'js', jsx=True) == "const A = () => <p>see http://example.com</p>;\n"
+
+
+def test_jsx_children_and_attributes_are_kept():
+    source = (
+        "const B = () => (\n"
+        "  <a href=\"http://x\" onClick={() => go('//y')}>\n"
+        "    don't // keep {items.map(i => <b key={i}>//{i}</b>)}\n"
+        "  </a>\n"
+        "); // gone\n"
+    )
+    assert lex_minify(source, 'js', jsx=True) == source.replace(" // gone", "")
+
+
+def test_comparisons_and_generics_are_not_jsx():
+    source = "for (let i = 0; i<n; i++) {} // gone\nconst f = <T,>(x: T) => x; // gone\n"
+    assert lex_minify(source, 'js', jsx=True) == "for (let i = 0; i<n; i++) {}\nconst f = <T,>(x: T) => x;\n"
+
+
+def test_skeleton_keeps_doc_of_single_line_declarations():
+    source = "/** Adds. */\nfunction add(a, b) { return a + b; }\n/**\n * Max.\n */\nconst MAX = 10;\n"
+    assert lex_skeleton(source, 'js') == (
+        "/** Adds. */\nfunction add(a, b) { return a + b; }\n/** Max. */\nconst MAX = 10;\n")
@@ -9,16 +9,58 @@ Usage:
     python context_router.py --query "fintech"
     python context_router.py --skill meta-thinker --query "SCAMPER"
     python context_router.py --skill meta-thinker --source industry_database --id fintech
+    python context_router.py --query "fintech" --max-tokens 800
+    python context_router.py --query "fintech" --fields name,trends[0] --format jsonl
+    python context_router.py --query "fintech" --stream --max-results 3
     python context_router.py --list
 """
 
 import argparse
+import codecs
+import hashlib
 import json
 import os
+import pickle
+import re
 import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import closing, redirect_stdout
+from io import StringIO
+from math import log
 
 SKILLS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..")
 
+# Compiled router index (token -> entries), rebuilt per file when data changes
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache")
+INDEX_FILE = os.path.join(CACHE_DIR, "router.idx")
+INDEX_VERSION = 4
+WORD_RE = re.compile(r"\w+")
+
+# --max-tokens packing: BM25 ranking, ~4 chars per token, long fields clipped
+BM25_K1 = 1.5
+BM25_B = 0.75
+CHARS_PER_TOKEN = 4
+TRUNCATE_CHARS = 200
+TRUNCATE_ITEMS = 5
+
+# Rendered query output, reused while the data files are unchanged (LRU)
+RESULT_DIR = os.path.join(CACHE_DIR, "results")
+RESULT_VERSION = 1
+RESULT_MAX_MB = 8
+RESULT_TTL = 24 * 3600
+
+# Flattened entry caches live next to each data file: <skill>/data/.cache/
+FLAT_DIR_NAME = ".cache"
+FLAT_VERSION = 3
+# Serialized spans are kept for object fields this many levels deep, so
+# --fields projections decode only the requested subtrees
+SPAN_DEPTH = 3
+# Data files are streamed in chunks of this many bytes, never parsed whole
+STREAM_CHUNK = 1 << 16
+_flat_cache = {}
+
 
 def discover_data_sources(skills_dir):
     """Find all JSON data files across all skills."""
@@ -49,29 +91,22 @@ def load_json(filepath):
 
 
 def search_in_value(value, query):
-    """Recursively check if query appears in a JSON value."""
-    query_lower = query.lower()
-    if isinstance(value, str):
-        return query_lower in value.lower()
-    elif isinstance(value, list):
-        return any(search_in_value(item, query) for item in value)
-    elif isinstance(value, dict):
-        return any(search_in_value(v, query) for v in value.values())
-    return False
+    """Check if query appears in any string of a JSON value (flattened once)."""
+    text = bytearray()
+    _flatten(value, "", text, [], [], {})
+    return bool(text) and query.lower().encode("utf-8") in text
 
 
 def search_data(data, query):
     """Search within a JSON data structure and return matching entries."""
+    needle = query.lower().encode("utf-8")
+    keyed = isinstance(data, dict)
     results = []
-
-    if isinstance(data, list):
-        for item in data:
-            if search_in_value(item, query):
-                results.append(item)
-    elif isinstance(data, dict):
-        for key, value in data.items():
-            if search_in_value(key, query) or search_in_value(value, query):
-                results.append({key: value})
+    for entry in _iter_entries(data):
+        text = bytearray()
+        _flatten_entry(entry, keyed, text, [], [], {})
+        if text and needle in text:
+            results.append(entry)
     return results
 
 
@@ -87,6 +122,1024 @@ def get_by_id(data, item_id):
     return None
 
 
+def _fingerprint(path):
+    """Cheap change detector: (mtime_ns, size)"""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _write_atomic(path, payload):
+    """Write bytes via a temp file + rename; a read-only install just skips it"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        return False
+
+
+def _read_pickle(path, version):
+    """Load a cache pickle, or None when missing, corrupt or outdated"""
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    if not isinstance(value, dict) or value.get("version") != version:
+        return None
+    return value
+
+
+# ---------- Streaming reader (top-level entries one at a time) ----------
+
+_WS = " \t\r\n"
+_DELIMITERS = _WS + ",:]}"
+
+
+def iter_json(filepath, hasher=None):
+    """Yield the top-level entries of a JSON file as _iter_entries() does
+    (list items, or {key: value} pairs of an object) without parsing it whole.
+
+    The file is read STREAM_CHUNK bytes at a time and each entry is decoded
+    with JSONDecoder.raw_decode as soon as it is complete, so memory holds
+    one entry plus one chunk. hasher (e.g. hashlib.sha1()) is fed every
+    byte read. Malformed JSON raises json.JSONDecodeError.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    with open(filepath, "rb") as f:
+        buf, pos, eof = "", 0, False
+
+        def more(size=STREAM_CHUNK):
+            nonlocal buf, pos, eof
+            raw = f.read(size)
+            if hasher is not None:
+                hasher.update(raw)
+            eof = not raw
+            buf = buf[pos:] + utf8.decode(raw, final=eof)
+            pos = 0
+            return not eof
+
+        def skip():
+            # Position of the next non-whitespace character, or -1 at EOF
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf):
+                    return pos
+                if not more():
+                    return -1
+
+        def value():
+            # Decode one complete value at pos; a value not followed by a
+            # delimiter (e.g. a number cut by the chunk boundary) is re-read
+            # once more data arrived
+            nonlocal pos
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    if eof or (end < len(buf) and buf[end] in _DELIMITERS):
+                        pos = end
+                        return item
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                more(max(STREAM_CHUNK, len(buf) - pos))
+
+        def expect(chars):
+            if skip() == -1 or buf[pos] not in chars:
+                raise json.JSONDecodeError(f"Expecting one of {chars!r}", buf, max(pos, 0))
+            return buf[pos]
+
+        more()
+        if skip() == -1:
+            raise json.JSONDecodeError("Expecting value", buf, 0)
+        opener = buf[pos]
+        if opener not in "[{":
+            # Scalar document: nothing to iterate, but it must still be valid
+            value()
+            if skip() != -1:
+                raise json.JSONDecodeError("Extra data", buf, pos)
+            return
+        closer = "]" if opener == "[" else "}"
+        pos += 1
+        if skip() != -1 and buf[pos] == closer:
+            pos += 1
+        else:
+            while True:
+                if opener == "{":
+                    expect('"')
+                    key = value()
+                    expect(":")
+                    pos += 1
+                    skip()
+                    yield {key: value()}
+                else:
+                    skip()
+                    yield value()
+                separator = expect("," + closer)
+                pos += 1
+                if separator == closer:
+                    break
+        if skip() != -1:
+            raise json.JSONDecodeError("Extra data", buf, pos)
+
+
+def json_container(filepath):
+    """'[' or '{' for a JSON file holding an array or object, else None"""
+    with open(filepath, "rb") as f:
+        head = f.read(64).decode("utf-8-sig", "ignore").lstrip(_WS)
+    return head[:1] if head[:1] in ("[", "{") else None
+
+
+def stream_search(filepath, query, max_results=None):
+    """search_data() straight from a data file, stopping at max_results.
+
+    Entries are streamed (see iter_json) and matched as they are decoded,
+    so reading ends with the last needed match. Returns (entries, complete),
+    complete being False when the file was not read to the end. A file that
+    turns out malformed has no matches, as with load_json().
+    """
+    needle = query.lower().encode("utf-8")
+    results = []
+    try:
+        keyed = json_container(filepath) == "{"
+        with closing(iter_json(filepath)) as entries:
+            for entry in entries:
+                text = bytearray()
+                _flatten_entry(entry, keyed, text, [], [], {})
+                if text and needle in text:
+                    results.append(entry)
+                    if max_results is not None and len(results) >= max_results:
+                        return results, False
+    except (OSError, ValueError):
+        return [], True
+    return results, True
+
+
+# ---------- Flattened entry cache (next to each data file) ----------
+
+def _iter_entries(data):
+    """Top-level entries as search_data() returns them: list items or {key: value}"""
+    if isinstance(data, list):
+        for item in data:
+            yield item
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield {key: value}
+
+
+def _flatten(value, path, text, starts, paths, seen):
+    """Append every string search_in_value() looks at to text, lowercased and
+    NUL-terminated, recording its byte offset and field path"""
+    if isinstance(value, str):
+        starts.append(len(text))
+        paths.append(seen.setdefault(path, path))
+        text += value.lower().encode("utf-8") + b"\0"
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            _flatten(item, f"{path}[{i}]", text, starts, paths, seen)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, f"{path}.{key}" if path else key, text, starts, paths, seen)
+
+
+def _flatten_entry(entry, keyed, text, starts, paths, seen):
+    """Flatten one top-level entry; a {key: value} entry of an object file
+    also matches on its key, like search_data()"""
+    if keyed:
+        key, value = next(iter(entry.items()))
+        _flatten(key, key, text, starts, paths, seen)
+        _flatten(value, key, text, starts, paths, seen)
+    else:
+        _flatten(entry, "", text, starts, paths, seen)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _encode(value, path, depth, out, spans):
+    """Append compact JSON of value to out (same bytes as _dumps), recording
+    the (start, end) span of every object field down to depth levels"""
+    if not isinstance(value, dict) or depth == 0:
+        out += _dumps(value)
+        return
+    out += b"{"
+    for n, (key, item) in enumerate(value.items()):
+        if n:
+            out += b","
+        out += _dumps(key) + b":"
+        child = f"{path}.{key}" if path else key
+        start = len(out)
+        _encode(item, child, depth - 1, out, spans)
+        spans[child] = (start, len(out))
+    out += b"}"
+
+
+def _flat_paths(filepath):
+    """(meta, blob) cache files for a data file: data/.cache/<name>.meta|.flat"""
+    base = os.path.join(os.path.dirname(filepath), FLAT_DIR_NAME, os.path.splitext(os.path.basename(filepath))[0])
+    return base + ".meta", base + ".flat"
+
+
+def _file_digest(filepath):
+    """sha1 of a file, read in STREAM_CHUNK pieces"""
+    hasher = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _build_flat(filepath, fingerprint):
+    """Flatten every entry of a data file once.
+
+    The blob holds all entries' lowercased text, then their compact JSON.
+    entry_text / entry_json are byte offsets into it (one extra at the end);
+    field_starts / field_paths locate each string inside the text part and
+    entry_spans maps object field paths to their JSON bytes (entry-relative).
+    id_table maps each id to its first entry and key_prefix lists
+    (lowercased id or name, entry) sorted for prefix lookups.
+
+    Entries are streamed from the file (iter_json) and hashed on the way,
+    so the parsed document is never held whole. A malformed file has no
+    entries, as with load_json().
+    """
+    hasher = hashlib.sha1()
+    keyed = json_container(filepath) == "{"
+    text, encoded = bytearray(), bytearray()
+    entry_text, entry_json, entry_spans = [], [], []
+    field_starts, field_paths, ids, names, seen = [], [], [], [], {}
+    try:
+        for entry in iter_json(filepath, hasher):
+            entry_text.append(len(text))
+            if keyed:
+                ids.append(next(iter(entry)))
+            else:
+                ids.append(entry.get("id") if isinstance(entry, dict) else None)
+            name = entry.get("name") if isinstance(entry, dict) and not keyed else None
+            names.append(name if isinstance(name, str) else None)
+            _flatten_entry(entry, keyed, text, field_starts, field_paths, seen)
+            start = len(encoded)
+            entry_json.append(start)
+            spans = {}
+            _encode(entry, "", SPAN_DEPTH, encoded, spans)
+            entry_spans.append({path: (a - start, b - start) for path, (a, b) in spans.items()})
+        digest = hasher.hexdigest()
+    except ValueError:
+        keyed, text, encoded = False, bytearray(), bytearray()
+        entry_text, entry_json, entry_spans = [], [], []
+        field_starts, field_paths, ids, names = [], [], [], []
+        digest = _file_digest(filepath)
+    entry_text.append(len(text))
+    entry_json.append(len(encoded))
+
+    entry_json = [offset + len(text) for offset in entry_json]
+    id_table, key_prefix = {}, set()
+    for i, (entry_id, name) in enumerate(zip(ids, names)):
+        if isinstance(entry_id, str):
+            id_table.setdefault(entry_id, i)
+            key_prefix.add((entry_id.lower(), i))
+        if name is not None:
+            key_prefix.add((name.lower(), i))
+    blob = bytes(text) + bytes(encoded)
+
+    flat = {
+        "version": FLAT_VERSION,
+        "file": filepath,
+        "fingerprint": fingerprint,
+        "hash": digest,
+        "keyed": keyed,
+        "ids": ids,
+        "names": names,
+        "id_table": id_table,
+        "key_prefix": sorted(key_prefix),
+        "entry_text": entry_text,
+        "entry_json": entry_json,
+        "entry_spans": entry_spans,
+        "field_starts": field_starts,
+        "field_paths": field_paths,
+    }
+    meta_path, blob_path = _flat_paths(filepath)
+    if not (_write_atomic(blob_path, blob)
+            and _write_atomic(meta_path, pickle.dumps(flat, protocol=pickle.HIGHEST_PROTOCOL))):
+        flat["_blob"] = blob
+    return flat
+
+
+def load_flat(filepath):
+    """Return the flattened cache of a JSON data file, (re)building it when
+    the file's content changed. Cached in-process and on disk next to the file.
+    """
+    filepath = os.path.abspath(filepath)
+    fingerprint = _fingerprint(filepath)
+    flat = _flat_cache.get(filepath)
+    if flat is not None and flat["fingerprint"] == fingerprint:
+        return flat
+
+    meta_path, blob_path = _flat_paths(filepath)
+    flat = _read_pickle(meta_path, FLAT_VERSION)
+    if flat is not None and (flat["file"] != filepath or not os.path.exists(blob_path)):
+        flat = None
+    if flat is not None and flat["fingerprint"] != fingerprint:
+        if flat["hash"] == _file_digest(filepath):
+            flat["fingerprint"] = fingerprint
+            _write_atomic(meta_path, pickle.dumps(flat, protocol=pickle.HIGHEST_PROTOCOL))
+        else:
+            flat = None
+    if flat is None:
+        flat = _build_flat(filepath, fingerprint)
+    _flat_cache[filepath] = flat
+    return flat
+
+
+def _read_spans(flat, spans):
+    """Bytes of (start, end) ranges of a flat blob, seeking instead of reading it all"""
+    blob = flat.get("_blob")
+    if blob is not None:
+        return [blob[start:end] for start, end in spans]
+    chunks = []
+    with open(_flat_paths(flat["file"])[1], "rb") as f:
+        for start, end in spans:
+            f.seek(start)
+            chunks.append(f.read(end - start))
+    return chunks
+
+
+def read_entry_json(flat, ids):
+    """Compact JSON text of the given entries (0-based), not decoded"""
+    spans = [(flat["entry_json"][i], flat["entry_json"][i + 1]) for i in ids]
+    return [chunk.decode("utf-8") for chunk in _read_spans(flat, spans)]
+
+
+def read_entries(flat, ids, fields=None):
+    """Decode only the given entries (0-based) of a flattened data file.
+
+    With fields (parsed paths, see parse_path), each entry is projected onto
+    them and only the serialized subtrees those paths need are read.
+    """
+    if fields is None:
+        return [json.loads(text) for text in read_entry_json(flat, ids)]
+
+    entries = []
+    for i in ids:
+        base, spans = flat["entry_json"][i], flat["entry_spans"][i]
+        plan = []
+        for path in fields:
+            prefix = _span_prefix(spans, path)
+            if prefix:
+                plan.append((path, prefix, spans[".".join(arg for _, arg in path[:prefix])]))
+            elif not spans or path[0][0] != "key" or path[0][1] == "*":
+                plan.append((path, 0, (0, flat["entry_json"][i + 1] - base)))
+        chunks = _read_spans(flat, [(base + start, base + end) for _, _, (start, end) in plan])
+        projected = MISSING
+        for (path, prefix, _), chunk in zip(plan, chunks):
+            value = _pick(json.loads(chunk.decode("utf-8")), path[prefix:])
+            for _, key in reversed(path[:prefix]):
+                value = MISSING if value is MISSING else {key: value}
+            projected = _merge(projected, value)
+        entries.append({} if projected is MISSING else projected)
+    return entries
+
+
+# ---------- Field projection (--fields / --select) ----------
+
+MISSING = object()
+_PATH_RE = re.compile(r"\[(\d+|\*)\]|\.?([^.\[\]]+)")
+
+
+def parse_path(path):
+    """JSONPath-lite: 'a.b[0].c', 'tags[*]', 'components.*' (leading '$.' optional).
+
+    Returns [(kind, arg)] with kind 'key' (arg a name or '*') or 'index'
+    (arg an int or '*').
+    """
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:].lstrip(".")
+    segments = []
+    for index, key in _PATH_RE.findall(path):
+        if index:
+            segments.append(("index", "*" if index == "*" else int(index)))
+        else:
+            segments.append(("key", key))
+    return segments
+
+
+def _span_prefix(spans, path):
+    """Length of the longest plain-key prefix of path with a stored span"""
+    best = 0
+    for n in range(1, min(len(path), SPAN_DEPTH) + 1):
+        if path[n - 1][0] != "key" or path[n - 1][1] == "*":
+            break
+        if ".".join(arg for _, arg in path[:n]) in spans:
+            best = n
+    return best
+
+
+def _pick(value, path):
+    """value reduced to the branches selected by path, keeping its shape"""
+    if not path:
+        return value
+    (kind, arg), rest = path[0], path[1:]
+    if kind == "key" and isinstance(value, dict):
+        items = value.items() if arg == "*" else ([(arg, value[arg])] if arg in value else [])
+        picked = {k: _pick(v, rest) for k, v in items}
+        picked = {k: v for k, v in picked.items() if v is not MISSING}
+        return picked if picked else MISSING
+    if kind == "index" and isinstance(value, list):
+        if arg == "*":
+            picked = [_pick(v, rest) for v in value]
+        else:
+            picked = [_pick(value[arg], rest)] if -len(value) <= arg < len(value) else []
+        picked = [v for v in picked if v is not MISSING]
+        return picked if picked else MISSING
+    return MISSING
+
+
+def _merge(a, b):
+    """Combine two projections of the same entry"""
+    if a is MISSING:
+        return b
+    if b is MISSING:
+        return a
+    if isinstance(a, dict) and isinstance(b, dict):
+        merged = dict(a)
+        for key, value in b.items():
+            merged[key] = _merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [_merge(x, y) for x, y in zip(a, b)]
+    return b
+
+
+def project(value, fields):
+    """An in-memory entry reduced to the given paths (as read_entries does)"""
+    projected = MISSING
+    for path in fields:
+        projected = _merge(projected, _pick(value, path))
+    return {} if projected is MISSING else projected
+
+
+def select_values(value, path):
+    """Values at path (wildcards expand), as a flat list"""
+    if not path:
+        return [value]
+    (kind, arg), rest = path[0], path[1:]
+    if kind == "key" and isinstance(value, dict):
+        children = value.values() if arg == "*" else ([value[arg]] if arg in value else [])
+    elif kind == "index" and isinstance(value, list):
+        children = value if arg == "*" else ([value[arg]] if -len(value) <= arg < len(value) else [])
+    else:
+        return []
+    return [found for child in children for found in select_values(child, rest)]
+
+
+def selected(value, path):
+    """What --select prints: the one value at path, else the list of them"""
+    values = select_values(value, path)
+    return values[0] if len(values) == 1 else values
+
+
+# ---------- Output encodings ----------
+
+FORMATS = ("json", "min", "jsonl", "kv")
+
+
+def _kv_lines(value, path):
+    """Terse 'path=value' lines; lists of scalars are joined with ', '"""
+    if isinstance(value, dict):
+        return [line for key, item in value.items()
+                for line in _kv_lines(item, f"{path}.{key}" if path else key)]
+    if isinstance(value, list) and not any(isinstance(item, (dict, list)) for item in value):
+        return [f"{path}={', '.join(_kv_scalar(item) for item in value)}"]
+    if isinstance(value, list):
+        return [line for i, item in enumerate(value) for line in _kv_lines(item, f"{path}[{i}]")]
+    return [f"{path or '$'}={_kv_scalar(value)}"]
+
+
+def _kv_scalar(value):
+    if isinstance(value, str):
+        return value.replace("\n", "\\n")
+    return json.dumps(value)
+
+
+def render(value, fmt="json", indent=2):
+    """Serialize one result: pretty/compact JSON, minified JSON or key=value lines"""
+    if fmt in ("min", "jsonl"):
+        return _dumps(value).decode("utf-8")
+    if fmt == "kv":
+        return "\n".join(_kv_lines(value, ""))
+    return json.dumps(value, indent=indent, ensure_ascii=False)
+
+
+def render_list(values, fmt="json", indent=2):
+    """Serialize a list of results; jsonl and kv put each on its own line(s)"""
+    if fmt == "jsonl":
+        return "\n".join(render(value, fmt) for value in values)
+    if fmt == "kv":
+        return "\n\n".join(render(value, fmt) for value in values)
+    return render(values, fmt, indent)
+
+
+def _field_at(flat, pos):
+    """Field path of the string containing text byte offset pos"""
+    return flat["field_paths"][bisect_right(flat["field_starts"], pos) - 1]
+
+
+def match_entries(flat, query, ids=None, all_fields=False):
+    """Find entries whose flattened text contains query (case-insensitive).
+
+    One substring search per entry on the precomputed text; ids restricts
+    the check to candidate entries. Returns [(entry_id, [field_path, ...])]
+    in file order, with the first matching field, or every one if all_fields.
+    """
+    needle = query.lower().encode("utf-8")
+    entry_text = flat["entry_text"]
+    if ids is None:
+        ids = range(len(entry_text) - 1)
+        text = _read_spans(flat, [(0, entry_text[-1])])[0]
+        chunks = (text[entry_text[i]:entry_text[i + 1]] for i in ids)
+    else:
+        chunks = _read_spans(flat, [(entry_text[i], entry_text[i + 1]) for i in ids])
+
+    matches = []
+    for i, chunk in zip(ids, chunks):
+        pos = chunk.find(needle) if chunk else -1
+        if pos == -1:
+            continue
+        fields = []
+        while pos != -1:
+            field = _field_at(flat, entry_text[i] + pos)
+            if field not in fields:
+                fields.append(field)
+            if not all_fields:
+                break
+            # Resume after the end of this string: one hit per field is enough
+            pos = chunk.find(needle, chunk.find(b"\0", pos + len(needle)) + 1)
+            if pos == 0:
+                break
+        matches.append((i, fields))
+    return matches
+
+
+def search_file(filepath, query, max_results=None, fields=None):
+    """search_data() for a data file, backed by its flattened cache.
+
+    Returns (total_matches, [(entry, field_path), ...]) with at most
+    max_results entries decoded (projected onto fields when given).
+    """
+    flat = load_flat(filepath)
+    matches = match_entries(flat, query)
+    shown = matches if max_results is None else matches[:max_results]
+    entries = read_entries(flat, [i for i, _ in shown], fields)
+    return len(matches), [(entry, found[0]) for entry, (_, found) in zip(entries, shown)]
+
+
+def get_file_entry(filepath, item_id, fields=None):
+    """get_by_id() for a data file: one id_table lookup, one entry decoded"""
+    flat = load_flat(filepath)
+    i = flat["id_table"].get(item_id)
+    return None if i is None else read_entries(flat, [i], fields)[0]
+
+
+def lookup_prefix(flat, prefix):
+    """Entries (0-based, file order) whose id or name starts with prefix,
+    case-insensitively, found by bisecting the sorted key_prefix table"""
+    prefix = prefix.lower()
+    keys = flat["key_prefix"]
+    found = set()
+    for key, i in keys[bisect_left(keys, (prefix, -1)):]:
+        if not key.startswith(prefix):
+            break
+        found.add(i)
+    return sorted(found)
+
+
+def lookup_contains(flat, text):
+    """Entries (0-based, file order) whose id or name contains text,
+    case-insensitively; scans only the cached keys, never the entries"""
+    text = text.lower()
+    found = set()
+    for key, i in flat["key_prefix"]:
+        if text in key:
+            found.add(i)
+    return sorted(found)
+
+
+# ---------- Router index (across all data files) ----------
+
+def _drop_source(index, key):
+    """Remove one source and its postings from the index"""
+    part = index["sources"].pop(key)
+    first, end = part["base"], part["base"] + part["count"]
+    for word in list(index["postings"]):
+        remaining = [doc for doc in index["postings"][word] if not first <= doc < end]
+        if remaining:
+            index["postings"][word] = remaining
+        else:
+            del index["postings"][word]
+    for item_id in list(index["ids"]):
+        remaining = [doc for doc in index["ids"][item_id] if not first <= doc < end]
+        if remaining:
+            index["ids"][item_id] = remaining
+        else:
+            del index["ids"][item_id]
+
+
+def _add_source(index, key, path, flat):
+    """Index the words of one flattened data file.
+
+    Entries get consecutive ids starting at the source's "base"; ids are
+    never reused, so other sources' postings stay valid.
+    """
+    base = index["next_id"]
+    count = len(flat["entry_text"]) - 1
+    starts = flat["entry_text"]
+    text = _read_spans(flat, [(0, starts[-1])])[0]
+    total_words = 0
+    for i in range(count):
+        words = WORD_RE.findall(text[starts[i]:starts[i + 1]].decode("utf-8"))
+        total_words += len(words)
+        for word in set(words):
+            index["postings"].setdefault(word, []).append(base + i)
+    for item_id, i in flat["id_table"].items():
+        index["ids"].setdefault(item_id, []).append(base + i)
+    index["next_id"] = base + count
+    index["sources"][key] = {
+        "file": path,
+        "fingerprint": flat["fingerprint"],
+        "hash": flat["hash"],
+        "base": base,
+        "count": count,
+        "words": total_words,
+    }
+
+
+def load_index(sources):
+    """Return the router index for sources ({key: path}), loading it from
+    .cache/router.idx and re-indexing only files whose content changed.
+
+    A file whose mtime/size changed but whose sha1 did not just gets its
+    stored fingerprint refreshed.
+    """
+    index = _read_pickle(INDEX_FILE, INDEX_VERSION)
+    if index is None:
+        index = {"version": INDEX_VERSION, "sources": {}, "postings": {}, "ids": {}, "next_id": 0}
+
+    changed = False
+    for key in list(index["sources"]):
+        if sources.get(key) != index["sources"][key]["file"]:
+            _drop_source(index, key)
+            changed = True
+
+    for key, path in sources.items():
+        try:
+            fingerprint = _fingerprint(path)
+        except OSError:
+            continue
+        part = index["sources"].get(key)
+        if part is not None and part["fingerprint"] == fingerprint:
+            continue
+        flat = load_flat(path)
+        if part is not None and part["hash"] == flat["hash"]:
+            part["fingerprint"] = flat["fingerprint"]
+        else:
+            if part is not None:
+                _drop_source(index, key)
+            _add_source(index, key, path, flat)
+        changed = True
+
+    if changed:
+        index["vocab"] = "\0".join(sorted(index["postings"]))
+        index["id_keys"] = sorted((item_id.lower(), item_id) for item_id in index["ids"])
+        _write_atomic(INDEX_FILE, pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+    return index
+
+
+def _words_containing(index, fragment):
+    """Indexed words that contain fragment, found with str.find on one
+    NUL-separated blob of the whole vocabulary"""
+    vocab = index.get("vocab", "")
+    found, pos = [], vocab.find(fragment)
+    while pos != -1:
+        start = vocab.rfind("\0", 0, pos) + 1
+        end = vocab.find("\0", pos)
+        if end == -1:
+            end = len(vocab)
+        found.append(vocab[start:end])
+        pos = vocab.find(fragment, end + 1)
+    return found
+
+
+def _docs_containing(index, word):
+    """Global entry ids whose text has an indexed word containing word"""
+    docs = set()
+    for match in _words_containing(index, word):
+        docs.update(index["postings"][match])
+    return docs
+
+
+def _split_docs(index, sources, docs):
+    """Group global entry ids by source: {key: [entry_id, ...]} (0-based)"""
+    parts = sorted((index["sources"][key]["base"], key) for key in sources if key in index["sources"])
+    bases = [base for base, _ in parts]
+    grouped = defaultdict(list)
+    for doc in docs:
+        pos = bisect_right(bases, doc) - 1
+        if pos < 0:
+            continue
+        base, key = parts[pos]
+        if doc - base < index["sources"][key]["count"]:
+            grouped[key].append(doc - base)
+    return grouped
+
+
+def lookup_ids(index, sources, item_id, prefix=False):
+    """get_by_id() across sources through the index's id table.
+
+    Exact ids are one dict lookup; with prefix, every id starting with
+    item_id (case-insensitive) is found by bisecting the sorted id keys.
+    Returns {key: [entry_id, ...]} in file order.
+    """
+    if prefix:
+        keys, start = index["id_keys"], item_id.lower()
+        docs = []
+        for lowered, match in keys[bisect_left(keys, (start, "")):]:
+            if not lowered.startswith(start):
+                break
+            docs.extend(index["ids"][match])
+    else:
+        docs = index["ids"].get(item_id, [])
+    return {key: sorted(ids) for key, ids in _split_docs(index, sources, docs).items()}
+
+
+def find_matches(index, sources, query, any_word=False):
+    """Match query against sources ({key: path}) through the index.
+
+    Candidates are the entries holding an indexed word that contains the
+    query's longest word (any substring match must); only their flattened
+    text is read and checked. With any_word, an entry matches when it
+    contains any of the query's words instead of the whole query.
+    Returns {key: (flat, [(entry_id, fields)])} in file order.
+    """
+    words = WORD_RE.findall(query.lower())
+    needles = list(dict.fromkeys(words)) if any_word and words else [query]
+    candidates = defaultdict(set)
+    for word in (needles if any_word and words else [max(words, key=len)] if words else []):
+        for key, ids in _split_docs(index, sources, _docs_containing(index, word)).items():
+            candidates[key].update(ids)
+
+    found = {}
+    for key in sorted(sources):
+        if key not in index["sources"] or (words and not candidates.get(key)):
+            continue
+        flat = load_flat(sources[key])
+        ids = sorted(candidates[key]) if words else None
+        merged = {}
+        for needle in needles:
+            for i, fields in match_entries(flat, needle, ids):
+                merged.setdefault(i, fields)
+        if merged:
+            found[key] = (flat, sorted(merged.items()))
+    return found
+
+
+def search_index(index, sources, query, max_results=None, fields=None):
+    """search_data() over many sources through the index.
+
+    Returns {key: (total, [(entry, field_path)])} with at most max_results
+    entries decoded per source, in file order (projected onto fields).
+    """
+    results = {}
+    for key, (flat, matches) in find_matches(index, sources, query).items():
+        shown = matches if max_results is None else matches[:max_results]
+        entries = read_entries(flat, [i for i, _ in shown], fields)
+        results[key] = (len(matches), [(entry, fields[0]) for entry, (_, fields) in zip(entries, shown)])
+    return results
+
+
+def rank_matches(index, found, query):
+    """Order matches from every source by BM25 against the query words.
+
+    IDF and average length come from the whole index; a query word's term
+    frequency counts its substring occurrences in the entry's text.
+    Returns [(score, key, entry_id, field_path)], best first; ties keep
+    source and file order.
+    """
+    words = list(dict.fromkeys(WORD_RE.findall(query.lower())))
+    total = sum(part["count"] for part in index["sources"].values()) or 1
+    avgdl = sum(part["words"] for part in index["sources"].values()) / total or 1
+    idf = {}
+    for word in words:
+        df = len(_docs_containing(index, word))
+        idf[word] = log((total - df + 0.5) / (df + 0.5) + 1)
+
+    ranked = []
+    for key, (flat, matches) in found.items():
+        starts = flat["entry_text"]
+        chunks = _read_spans(flat, [(starts[i], starts[i + 1]) for i, _ in matches])
+        for (i, fields), chunk in zip(matches, chunks):
+            text = chunk.decode("utf-8")
+            length = len(WORD_RE.findall(text))
+            score = 0.0
+            for word in words:
+                tf = text.count(word)
+                if tf:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+                    score += idf[word] * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked.append((score, key, i, fields[0]))
+    ranked.sort(key=lambda hit: -hit[0])
+    return ranked
+
+
+def estimate_tokens(text):
+    """Rough token count of serialized output (~4 characters per token)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _truncate(value, path, clipped):
+    """Copy of value with long strings and lists shortened; clipped collects
+    the paths that were cut"""
+    if isinstance(value, str) and len(value) > TRUNCATE_CHARS:
+        clipped.append(path or "$")
+        return value[:TRUNCATE_CHARS] + "…"
+    if isinstance(value, list):
+        items = [_truncate(item, f"{path}[{i}]", clipped) for i, item in enumerate(value[:TRUNCATE_ITEMS])]
+        if len(value) > TRUNCATE_ITEMS:
+            clipped.append(path or "$")
+            items.append(f"… +{len(value) - TRUNCATE_ITEMS} more")
+        return items
+    if isinstance(value, dict):
+        return {k: _truncate(v, f"{path}.{k}" if path else k, clipped) for k, v in value.items()}
+    return value
+
+
+def _packed_header(rank, key, score, field):
+    return f"\n🏅 #{rank} [{key}] score {score:.2f} · matched {field or '$'}"
+
+
+def pack_results(ranked, found, max_tokens, indent=None, fields=None, fmt="json", select=None):
+    """Greedily fill a token budget with the best-ranked entries.
+
+    Entries are projected onto fields (then reduced to the values at
+    select, if given) and costed exactly as printed in fmt; those with none
+    of the fields are skipped. Each entry goes in whole when it fits, else
+    with long fields truncated; entries that fit neither way are elided and
+    lower-ranked ones are still tried. Returns (packed, elided, used_tokens):
+    packed is [(key, score, field, shaped entry, clipped_paths)], elided
+    [(key, entry_id)].
+    """
+    packed, elided, used = [], [], 0
+    for score, key, i, field in ranked:
+        header = _packed_header(len(packed) + 1, key, score, field)
+        if used + estimate_tokens(header) + 1 > max_tokens:
+            elided.append((key, i))
+            continue
+        entry = read_entries(found[key][0], [i], fields)[0]
+        if fields is not None and not entry:
+            continue
+        if select is not None:
+            entry = selected(entry, select)
+        clipped = []
+        short = _truncate(entry, "", clipped)
+        options = [(entry, [])] + ([(short, clipped)] if clipped else [])
+        for value, cut in options:
+            cost = estimate_tokens(header) + estimate_tokens(render(value, fmt, indent))
+            if used + cost <= max_tokens:
+                packed.append((key, score, field, value, cut))
+                used += cost
+                break
+        else:
+            elided.append((key, i))
+    return packed, elided, used
+
+
+def cache_writable():
+    """Whether the router's index cache can be written here"""
+    target = CACHE_DIR
+    while not os.path.exists(target):
+        target = os.path.dirname(target)
+    return os.access(target, os.W_OK)
+
+
+# ---------- Result cache (shared with meta-thinker's idea_engine) ----------
+
+class ResultCache:
+    """On-disk LRU cache of rendered query output.
+
+    Keys hash a namespace, the normalized parameters and the (mtime, size)
+    fingerprint of every data file the answer depends on, so editing a data
+    file invalidates its results. A hit refreshes the entry's mtime; writes
+    evict least recently used entries beyond max_mb and entries older than
+    ttl seconds never hit. Hit/miss totals are kept in stats.pkl.
+    """
+
+    def __init__(self, enabled=True, max_mb=RESULT_MAX_MB, ttl=RESULT_TTL, directory=RESULT_DIR):
+        self.enabled = enabled
+        self.max_bytes = int(max_mb * (1 << 20))
+        self.ttl = ttl
+        self.directory = directory
+        self.hit = None
+        self.saved = 0.0
+        self.stats = None
+
+    def key(self, namespace, params, files):
+        fingerprints = []
+        for path in sorted(files):
+            try:
+                fingerprints.append((path, _fingerprint(path)))
+            except OSError:
+                fingerprints.append((path, None))
+        raw = json.dumps([RESULT_VERSION, namespace, params, fingerprints], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".res")
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        entry = _read_pickle(path, RESULT_VERSION)
+        if entry is None or time.time() - entry["created"] > self.ttl:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.saved = entry["elapsed"]
+        return entry["output"]
+
+    def put(self, key, output, elapsed):
+        if not self.enabled:
+            return
+        entry = {"version": RESULT_VERSION, "created": time.time(), "elapsed": elapsed, "output": output}
+        if _write_atomic(self._path(key), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)):
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".res")]
+        except OSError:
+            return
+        entries, total = [], 0
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, name))
+            total += st.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+    def cached(self, namespace, params, files, compute):
+        """Output of compute() (a str), from the cache when possible"""
+        key = self.key(namespace, params, files)
+        output = self.get(key)
+        self.hit = output is not None
+        if output is None:
+            start = time.perf_counter()
+            output = compute()
+            self.put(key, output, time.perf_counter() - start)
+        self._record()
+        return output
+
+    def _record(self):
+        if not self.enabled:
+            return
+        stats_path = os.path.join(self.directory, "stats.pkl")
+        stats = _read_pickle(stats_path, RESULT_VERSION) or {"version": RESULT_VERSION, "hits": 0, "misses": 0, "saved": 0.0}
+        stats["hits" if self.hit else "misses"] += 1
+        stats["saved"] += self.saved if self.hit else 0.0
+        _write_atomic(stats_path, pickle.dumps(stats, protocol=pickle.HIGHEST_PROTOCOL))
+        self.stats = stats
+
+    def summary(self):
+        """One line for stderr, e.g. 💾 Result cache: hit (saved 41 ms) · 12 hits / 3 misses so far"""
+        if not self.enabled or self.hit is None:
+            return None
+        now = f"hit (saved {self.saved * 1000:.0f} ms)" if self.hit else "miss"
+        stats = self.stats
+        if not stats:
+            return f"💾 Result cache: {now}"
+        return (f"💾 Result cache: {now} · {stats['hits']} hit(s) / {stats['misses']} miss(es) so far, "
+                f"~{stats['saved'] * 1000:,.0f} ms saved")
+
+
 def list_sources(sources):
     """Print all available data sources."""
     print("📂 Available Data Sources:")
@@ -104,6 +1157,14 @@ def list_sources(sources):
     print(f"\nTotal: {len(sources)} data sources")
 
 
+def positive_int(text):
+    """argparse type: an integer > 0"""
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {text}")
+    return value
+
+
 def main():
     parser = argparse.ArgumentParser(description="Smart Context Router — Query skill data efficiently")
     parser.add_argument("--query", "-q", help="Search query (keyword)")
@@ -113,6 +1174,18 @@ def main():
     parser.add_argument("--list", "-l", action="store_true", help="List all data sources")
     parser.add_argument("--max-results", type=int, default=5, help="Max results per source (default: 5)")
     parser.add_argument("--compact", action="store_true", help="Compact JSON output (no indentation)")
+    parser.add_argument("--max-tokens", type=positive_int, help="Rank matches across all sources (BM25) and pack the best into ~N tokens")
+    parser.add_argument("--fields", help="Only return these fields, e.g. 'name,pain_points[0],tech_stacks[*].name'")
+    parser.add_argument("--select", help="Return just the values at one JSONPath-lite path, e.g. '$.tech_stacks[*].name'")
+    parser.add_argument("--stream", action="store_true",
+                        help="Scan data files directly, stopping at --max-results matches per source (no index)")
+    parser.add_argument("--format", "-f", choices=FORMATS, default="json",
+                        help="json (default), min (minified JSON), jsonl (one entry per line), kv (key=value lines)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the query result cache")
+    parser.add_argument("--cache-size", type=float, default=RESULT_MAX_MB,
+                        help=f"Result cache size cap in MB (default: {RESULT_MAX_MB})")
+    parser.add_argument("--cache-ttl", type=int, default=RESULT_TTL,
+                        help=f"Seconds a cached result stays valid (default: {RESULT_TTL})")
 
     args = parser.parse_args()
 
@@ -150,30 +1223,105 @@ def main():
         print(f"No data sources found matching filters.", file=sys.stderr)
         sys.exit(1)
 
-    # Search or get by ID
+    cache = ResultCache(enabled=not args.no_cache, max_mb=args.cache_size, ttl=args.cache_ttl)
+    # Keyed on the exact query: the output echoes it back as typed
+    params = {name: value for name, value in vars(args).items() if not name.startswith("cache") and name != "no_cache"}
+
+    def compute():
+        out = StringIO()
+        with redirect_stdout(out):
+            run_query(args, sources, filtered)
+        return out.getvalue()
+
+    # The script itself is a dependency too: an upgrade must not serve old output
+    files = list(sources.values()) + [os.path.abspath(__file__)]
+    sys.stdout.write(cache.cached("router", params, files, compute))
+    summary = cache.summary()
+    if summary:
+        print(summary, file=sys.stderr)
+
+
+def run_query(args, sources, filtered):
+    """Search or get by ID, printing results"""
     indent = None if args.compact else 2
-    total_results = 0
+    total_results = fieldless = 0
+    fields = [parse_path(f) for f in args.fields.split(",") if f.strip()] if args.fields else None
+    if args.select:
+        fields = [parse_path(args.select)]
 
-    for key, path in sorted(filtered.items()):
-        data = load_json(path)
-        if data is None:
-            continue
+    def shape(entry):
+        return selected(entry, fields[0]) if args.select else entry
 
-        if args.id:
-            result = get_by_id(data, args.id)
-            if result:
-                print(f"\n🎯 [{key}] ID: {args.id}")
-                print(json.dumps(result, indent=indent, ensure_ascii=False))
+    if args.id:
+        index = load_index(sources)
+        found = lookup_ids(index, filtered, args.id)
+        if not found:
+            # Partial id: every entry whose id starts with it
+            found = lookup_ids(index, filtered, args.id, prefix=True)
+        for key, ids in sorted(found.items()):
+            flat = load_flat(filtered[key])
+            for i, result in zip(ids, read_entries(flat, ids[:args.max_results], fields)):
+                if not result:
+                    fieldless += fields is not None
+                    continue
+                print(f"\n🎯 [{key}] ID: {flat['ids'][i]}")
+                print(render(shape(result), args.format, indent))
                 total_results += 1
-        elif args.query:
-            results = search_data(data, args.query)
-            if results:
-                shown = results[:args.max_results]
-                print(f"\n🔍 [{key}] {len(results)} match(es)" +
-                      (f" (showing top {args.max_results})" if len(results) > args.max_results else ""))
-                print(json.dumps(shown, indent=indent, ensure_ascii=False))
-                total_results += len(results)
+    elif args.max_tokens is not None:
+        index = load_index(sources)
+        found = find_matches(index, filtered, args.query, any_word=True)
+        ranked = rank_matches(index, found, args.query)
+        packed, elided, used = pack_results(ranked, found, args.max_tokens, indent, fields, args.format,
+                                            fields[0] if args.select else None)
+        if fields is not None:
+            fieldless = len(ranked) - len(packed) - len(elided)
+        print(f"🔍 {len(ranked)} match(es) in {len(found)} source(s), best {len(packed)} packed into "
+              f"~{used}/{args.max_tokens} tokens")
+        for rank, (key, score, field, entry, clipped) in enumerate(packed, 1):
+            print(_packed_header(rank, key, score, field))
+            print(render(entry, args.format, indent))
+            if clipped:
+                print(f"✂️  truncated: {', '.join(clipped)}")
+        if elided:
+            by_source = defaultdict(int)
+            for key, _ in elided:
+                by_source[key] += 1
+            top = sorted(by_source.items(), key=lambda item: -item[1])[:5]
+            more = len(by_source) - len(top)
+            print(f"\n⏭️  Elided {len(elided)} lower-ranked match(es) over budget: " +
+                  ", ".join(f"{key} ({n})" for key, n in top) + (f", +{more} more source(s)" if more else ""))
+        total_results = len(ranked) - fieldless
+    elif args.stream or not cache_writable():
+        # Without a usable index, stream each file and stop at the last needed match
+        for key, path in sorted(filtered.items()):
+            shown, complete = stream_search(path, args.query, args.max_results)
+            if fields is not None:
+                entries = [entry for entry in (project(entry, fields) for entry in shown) if entry]
+                fieldless += len(shown) - len(entries)
+                shown = entries
+            if not shown:
+                continue
+            print(f"\n🔍 [{key}] {len(shown)}{'' if complete else '+'} match(es)" +
+                  ("" if complete else f" (showing first {len(shown)})"))
+            print(render_list([shape(entry) for entry in shown], args.format, indent))
+            total_results += len(shown)
+    else:
+        index = load_index(sources)
+        found = search_index(index, filtered, args.query, args.max_results, fields)
+        for key, (count, shown) in found.items():
+            entries = [entry for entry, _ in shown if fields is None or entry]
+            if len(entries) < len(shown):
+                fieldless += len(shown) - len(entries)
+                count -= len(shown) - len(entries)
+            if not entries:
+                continue
+            print(f"\n🔍 [{key}] {count} match(es)" +
+                  (f" (showing top {len(entries)})" if count > len(entries) else ""))
+            print(render_list([shape(entry) for entry in entries], args.format, indent))
+            total_results += count
 
+    if fieldless:
+        print(f"\n⚠️  {fieldless} match(es) have none of the requested fields ({args.select or args.fields}); omitted")
     if total_results == 0:
         target = args.id or args.query
         print(f"No results found for: '{target}'")
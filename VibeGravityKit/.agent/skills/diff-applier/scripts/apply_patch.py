@@ -4,92 +4,430 @@ Diff Applier — Apply SEARCH/REPLACE blocks safely.
 
 Usage:
     python apply_patch.py <target_file> <patch_file>
+    python apply_patch.py --bundle changes.patch [more.patch patches_dir/ ...]
+    python apply_patch.py --undo [journal_id]
 """
 
 import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
 import sys
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+# Multi-file bundles: each file's blocks follow a "*** FILE: <path>" line
+FILE_HEADER = re.compile(r"^\*\*\* FILE: (.+?)[ \t]*$", re.MULTILINE)
+PATCH_SUFFIXES = ('.patch', '.diff', '.txt')
+# Undo journals (original copies + journal.json), newest JOURNAL_KEEP kept.
+# Anchored at this kit's .agent directory so --undo works from any cwd.
+AGENT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+UNDO_DIR = AGENT_DIR / "undo"
+JOURNAL_NAME = "journal.json"
+JOURNAL_KEEP = 20
+UNDOABLE = ("committed", "partially undone", "pending")
+
+def parse_blocks(patch_content):
+    """SEARCH/REPLACE pairs of a patch, stripped; None for a malformed block.
+    Returns None when the patch has no SEARCH block at all."""
+    blocks = patch_content.split('<<<<<<< SEARCH')
+    if len(blocks) < 2:
+        return None
+    parsed = []
+    for block in blocks[1:]: # Skip preamble
+        if '=======' not in block or '>>>>>>> REPLACE' not in block:
+            parsed.append(None)
+            continue
+        search_part, rest = block.split('=======', 1)
+        replace_part, _ = rest.split('>>>>>>> REPLACE', 1)
+        parsed.append((search_part.strip(), replace_part.strip()))
+    return parsed
+
+class LineIndex:
+    """Start offset of every line of a text, and line numbers by line text.
+    Lets a multi-line SEARCH block be located from one of its interior
+    lines (which must match a whole line) instead of scanning the text."""
+
+    def __init__(self, text):
+        self.starts = []
+        self.lines = {}
+        offset = 0
+        for number, line in enumerate(text.split('\n')):
+            self.starts.append(offset)
+            self.lines.setdefault(line, []).append(number)
+            offset += len(line) + 1
+
+def find_occurrences(content, search, index=None, limit=2):
+    """Offsets of the first `limit` non-overlapping matches of search
+    (the same matches str.count would see)"""
+    parts = search.split('\n')
+    if index is None or len(parts) < 3:
+        found = []
+        pos = content.find(search)
+        while pos != -1 and len(found) < limit:
+            found.append(pos)
+            pos = content.find(search, pos + len(search))
+        return found
+
+    # Anchor on the rarest interior line; a match starts a fixed distance before it
+    k = min(range(1, len(parts) - 1), key=lambda i: len(index.lines.get(parts[i], ())))
+    lead = sum(len(part) + 1 for part in parts[:k])
+    found = []
+    for number in index.lines.get(parts[k], ()):
+        pos = index.starts[number] - lead
+        if pos >= 0 and (not found or pos >= found[-1] + len(search)) and content.startswith(search, pos):
+            found.append(pos)
+            if len(found) == limit:
+                break
+    return found
+
+def plan_splices(content, blocks):
+    """Locate every block in the original content up front.
+
+    A block must match exactly once and must not overlap a block accepted
+    before it; otherwise it is reported and skipped. Returns
+    (splices sorted by offset as (start, end, replacement), error messages).
+    """
+    index = LineIndex(content) if any(b and b[0].count('\n') >= 2 for b in blocks) else None
+    splices, errors = [], []
+    for block in blocks:
+        if block is None:
+            errors.append("❌ Malformed block (missing separator or end tag)")
+            continue
+        search_text, replace_text = block
+        if not search_text:
+            errors.append("❌ Empty SEARCH block. Aborting block.")
+            continue
+
+        found = find_occurrences(content, search_text, index)
+        if not found:
+            errors.append(f"❌ Could not find SEARCH block:\n{search_text[:50]}...")
+            continue
+        # Check uniqueness
+        if len(found) > 1:
+            errors.append(f"❌ SEARCH block matches multiple locations. Aborting block:\n{search_text[:50]}...")
+            continue
+
+        start, end = found[0], found[0] + len(search_text)
+        i = bisect.bisect_left(splices, (start,))
+        if (i > 0 and splices[i - 1][1] > start) or (i < len(splices) and splices[i][0] < end):
+            errors.append(f"❌ SEARCH block overlaps another block. Aborting block:\n{search_text[:50]}...")
+            continue
+        splices.insert(i, (start, end, replace_text))
+    return splices, errors
+
+def splice(content, splices):
+    """Build the patched text in one join"""
+    parts = []
+    pos = 0
+    for start, end, replacement in splices:
+        parts.append(content[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(content[pos:])
+    return "".join(parts)
+
+def parse_bundle(patch_content, default_target=None):
+    """[(target, patch text)] sections of a multi-file patch. Each section
+    starts with a `*** FILE: <path>` line; blocks before the first header
+    belong to default_target, and without one they are an error (a bundle
+    is all-or-nothing, so they are never dropped)."""
+    parts = FILE_HEADER.split(patch_content)
+    sections = []
+    if '<<<<<<< SEARCH' in parts[0]:
+        if not default_target:
+            raise ValueError("SEARCH block(s) before the first '*** FILE: <path>' header; no target file")
+        sections.append((default_target, parts[0]))
+    sections.extend(zip(parts[1::2], parts[2::2]))
+    return sections
+
+def load_bundles(sources):
+    """[(target, patch text)] from bundle files and directories of patches.
+    In a directory only .patch/.diff/.txt files are read, and one without
+    FILE headers targets the path it mirrors: patches/src/app.py.patch -> src/app.py."""
+    sections = []
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            files = sorted(p for p in source.rglob('*') if p.is_file() and p.suffix in PATCH_SUFFIXES)
+            defaults = [str(p.relative_to(source).with_suffix('')) for p in files]
+        elif source.is_file():
+            files, defaults = [source], [None]
+        else:
+            raise FileNotFoundError(f"Patch file not found: {source}")
+        for path, default in zip(files, defaults):
+            with open(path, 'r', encoding='utf-8') as f:
+                try:
+                    sections.extend(parse_bundle(f.read(), default))
+                except ValueError as e:
+                    raise ValueError(f"{path}: {e}") from None
+    return sections
+
+def _sha1(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _prepare(job):
+    """Worker: read one target and plan its splices.
+    Returns (target, content, new content, changes, errors)."""
+    target, patches = job
+    if not target.is_file():
+        return target, None, None, 0, [f"❌ Target file not found: {target}"]
+    try:
+        with open(target, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return target, None, None, 0, [f"❌ Cannot read {target}: {e}"]
+
+    blocks = []
+    for patch_content in patches:
+        parsed = parse_blocks(patch_content)
+        blocks.extend(parsed if parsed is not None else [None])
+    splices, errors = plan_splices(content, blocks)
+    return target, content, splice(content, splices), len(splices), errors
+
+def _write_temp(job):
+    """Worker: write new content next to its target. Returns (tmp path, error)."""
+    target, new_content = job
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+        shutil.copymode(target, tmp)
+        return tmp, None
+    except OSError as e:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return None, str(e)
+
+def _restore(target, backup):
+    """Put a backup copy back in place atomically"""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.undo.tmp")
+    shutil.copy2(backup, tmp)
+    os.replace(tmp, target)
+
+def _save_journal(journal_dir, journal):
+    tmp = journal_dir / f"{JOURNAL_NAME}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, indent=2)
+    os.replace(tmp, journal_dir / JOURNAL_NAME)
+
+def _prune_journals():
+    journals = sorted(p for p in UNDO_DIR.iterdir() if p.is_dir()) if os.path.isdir(UNDO_DIR) else []
+    for old in journals[:-JOURNAL_KEEP]:
+        shutil.rmtree(old, ignore_errors=True)
+
+def apply_changes(sections, strict=True, jobs=None):
+    """Apply [(target, patch text)] as one transaction.
+
+    1. Validate: every target is read and every block planned (in
+       parallel). With strict, any problem aborts before a byte is written;
+       otherwise bad blocks are skipped as before.
+    2. Journal: originals are copied to .agent/undo/<id>/ with a journal
+       listing each file's sha1 before and after.
+    3. Write: new contents go to temp files next to their targets (in
+       parallel), then each is os.replace()d in. A failure while writing
+       leaves every target untouched; one during the replace step rolls
+       back the files already replaced.
+
+    Returns (changed targets, total changes, journal dir or None).
+    """
+    grouped = {}
+    for target, patch_content in sections:
+        grouped.setdefault(Path(os.path.normpath(target)), []).append(patch_content)
+    workers = min(jobs or 8, max(len(grouped), 1))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        prepared = list(pool.map(_prepare, grouped.items()))
+
+    problems = 0
+    for target, _, _, _, errors in prepared:
+        for error in errors:
+            print(error if len(grouped) == 1 else error.replace("❌ ", f"❌ {target}: ", 1))
+        problems += len(errors)
+    if strict and problems:
+        print(f"❌ Validation failed: {problems} problem(s). No files were changed.")
+        sys.exit(1)
+
+    changed = [(target, content, new_content, changes) for target, content, new_content, changes, _ in prepared
+               if changes and new_content != content]
+    total = sum(changes for _, _, _, changes, _ in prepared)
+    if not changed:
+        return [], total, None
+
+    journal_dir = UNDO_DIR / datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    (journal_dir / "files").mkdir(parents=True, exist_ok=True)
+    journal = {"id": journal_dir.name, "created": datetime.now().isoformat(timespec="seconds"),
+               "status": "pending", "files": []}
+    for i, (target, content, new_content, _) in enumerate(changed):
+        backup = journal_dir / "files" / str(i)
+        shutil.copy2(target, backup)
+        journal["files"].append({"path": str(target.resolve()), "backup": f"files/{i}",
+                                 "before": _sha1(content), "after": _sha1(new_content)})
+    _save_journal(journal_dir, journal)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        temps = list(pool.map(_write_temp, [(target, new_content) for target, _, new_content, _ in changed]))
+    failed = [(target, error) for (target, *_), (_, error) in zip(changed, temps) if error]
+    if failed:
+        for tmp, _ in temps:
+            if tmp:
+                os.remove(tmp)
+        shutil.rmtree(journal_dir, ignore_errors=True)
+        for target, error in failed:
+            print(f"❌ Cannot write {target}: {error}")
+        print("❌ No files were changed.")
+        sys.exit(1)
+
+    done = []
+    try:
+        for (target, *_), (tmp, _) in zip(changed, temps):
+            os.replace(tmp, target)
+            done.append(target)
+    except OSError as e:
+        print(f"❌ Commit failed at {target}: {e}. Rolling back {len(done)} file(s).")
+        for i, target in enumerate(done):
+            _restore(target, journal_dir / "files" / str(i))
+        for tmp, _ in temps[len(done):]:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        journal["status"] = "rolled back"
+        _save_journal(journal_dir, journal)
+        sys.exit(1)
+
+    journal["status"] = "committed"
+    _save_journal(journal_dir, journal)
+    _prune_journals()
+    return [target for target, *_ in changed], total, journal_dir
+
+def _load_journal(journal_dir):
+    """A journal's contents, or None (with a warning) if it is unreadable"""
+    try:
+        journal = json.loads((journal_dir / JOURNAL_NAME).read_text(encoding='utf-8'))
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"⚠️ Skipping unreadable undo journal {journal_dir.name}: {e}")
+        return None
+    if not isinstance(journal, dict) or "status" not in journal or not isinstance(journal.get("files"), list):
+        print(f"⚠️ Skipping malformed undo journal {journal_dir.name}")
+        return None
+    return journal
+
+def undo(journal_id=None, force=False):
+    """Restore the files of a journal (default: the newest one not yet undone).
+    A file edited since the patch (sha1 differs) is left alone unless force."""
+    journal = None
+    if journal_id:
+        journal_dir = UNDO_DIR / journal_id
+        if (journal_dir / JOURNAL_NAME).exists():
+            journal = _load_journal(journal_dir)
+    else:
+        candidates = sorted(p for p in UNDO_DIR.iterdir() if (p / JOURNAL_NAME).exists()) \
+            if os.path.isdir(UNDO_DIR) else []
+        for journal_dir in reversed(candidates):
+            journal = _load_journal(journal_dir)
+            if journal and journal["status"] in UNDOABLE:
+                break
+            journal = None
+    if not journal:
+        print("❌ Nothing to undo.")
+        sys.exit(1)
+
+    restored, skipped = 0, 0
+    for entry in journal["files"]:
+        target = Path(entry["path"])
+        try:
+            with open(target, 'r', encoding='utf-8') as f:
+                current = _sha1(f.read())
+        except (OSError, UnicodeDecodeError):
+            current = None
+        if current == entry["before"]:
+            continue
+        if current != entry["after"] and not force:
+            print(f"⚠️ {target} changed since the patch; skipped (use --force to restore anyway)")
+            skipped += 1
+            continue
+        _restore(target, journal_dir / entry["backup"])
+        restored += 1
+        print(f"↩️  Restored {target}")
+
+    journal["status"] = "undone" if not skipped else "partially undone"
+    _save_journal(journal_dir, journal)
+    print(f"✅ Undid {journal['id']}: {restored} file(s) restored, {skipped} skipped.")
+
 def apply_patch(target_file, patch_file):
     target = Path(target_file)
     patch = Path(patch_file)
-    
+
     if not target.exists():
         print(f"❌ Target file not found: {target}")
         sys.exit(1)
-        
+
     if not patch.exists():
         print(f"❌ Patch file not found: {patch}")
         sys.exit(1)
-        
+
     print(f"🔧 Applying patch to {target.name}...")
-    
-    with open(target, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
+
     with open(patch, 'r', encoding='utf-8') as f:
         patch_content = f.read()
-        
-    # Parse blocks
-    blocks = patch_content.split('<<<<<<< SEARCH')
-    if len(blocks) < 2:
+
+    if parse_blocks(patch_content) is None:
         print("❌ No SEARCH blocks found in patch.")
         sys.exit(1)
-        
-    new_content = content
-    changes_count = 0
-    
-    for block in blocks[1:]: # Skip preamble
-        if '=======' not in block or '>>>>>>> REPLACE' not in block:
-            print("❌ Malformed block (missing separator or end tag)")
-            continue
-            
-        search_part, rest = block.split('=======', 1)
-        replace_part, _ = rest.split('>>>>>>> REPLACE', 1)
-        
-        search_text = search_part.strip()
-        replace_text = replace_part.strip()
-        
-        # Try to find exact match (ignoring leading/trailing whitespace of the block itself, but keeping internal structure)
-        # Actually, simpler: search for the exact lines
-        
-        if search_text not in new_content:
-             # Try stricter normalization if exact match fails?
-             # For now, strict.
-             print(f"❌ Could not find SEARCH block:\n{search_text[:50]}...")
-             continue
-             
-        # Check uniqueness
-        if new_content.count(search_text) > 1:
-            print(f"❌ SEARCH block matches multiple locations. Aborting block:\n{search_text[:50]}...")
-            continue
-            
-        new_content = new_content.replace(search_text, replace_text)
-        changes_count += 1
-        
-    if changes_count == 0:
+
+    # Bad blocks are skipped; the file itself is replaced atomically
+    changed, changes_count, journal_dir = apply_changes([(target, patch_content)], strict=False)
+
+    if not changed and changes_count:
+        # Every REPLACE equals its SEARCH: nothing to write, nothing failed
+        print(f"✅ Already applied: {changes_count} change(s) leave {target.name} unchanged.")
+        return
+    if not changed:
         print("⚠️ No changes applied.")
         sys.exit(1)
-        
-    # Backup
-    backup = target.with_suffix('.bak')
-    shutil.copy2(target, backup)
-    print(f"📦 Backup created: {backup.name}")
-    
-    # Write
-    with open(target, 'w', encoding='utf-8') as f:
-        f.write(new_content)
-        
+
+    print(f"📦 Undo journal: {journal_dir} (python apply_patch.py --undo)")
     print(f"✅ Applied {changes_count} changes.")
-    
+
     # Auto-Lint
     run_linter(target)
-    
+
     # Auto-Index
     run_indexer(target)
 
+def apply_bundle(sources, jobs=None):
+    try:
+        sections = load_bundles(sources)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        print("❌ No files were changed.")
+        sys.exit(1)
+    if not sections:
+        print("❌ No '*** FILE: <path>' sections found in bundle.")
+        sys.exit(1)
+
+    targets = {os.path.normpath(target) for target, _ in sections}
+    print(f"🔧 Applying {len(sections)} patch section(s) to {len(targets)} file(s)...")
+    changed, changes_count, journal_dir = apply_changes(sections, strict=True, jobs=jobs)
+    if not changed and changes_count:
+        print(f"✅ Already applied: {changes_count} change(s) leave every file unchanged.")
+        return
+    if not changed:
+        print("⚠️ No changes applied.")
+        sys.exit(1)
+
+    print(f"📦 Undo journal: {journal_dir} (python apply_patch.py --undo)")
+    print(f"✅ Applied {changes_count} changes to {len(changed)} file(s).")
+    for target in changed:
+        run_linter(target)
+    run_indexer(changed[0])
+
 def run_linter(target):
     print("\n🔍 Running Linter...")
     # Simple heuristic
@@ -127,11 +465,23 @@ def run_indexer(target):
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("target_file")
-    parser.add_argument("patch_file")
+    parser.add_argument("target_file", nargs="?")
+    parser.add_argument("patch_file", nargs="?")
+    parser.add_argument("--bundle", "-b", nargs="+", metavar="PATCH|DIR",
+                        help="Multi-file patch(es) with '*** FILE: <path>' sections, or directories of patches")
+    parser.add_argument("--jobs", "-j", type=int, help="Parallel workers for bundles (default: 8)")
+    parser.add_argument("--undo", nargs="?", const="", metavar="ID", help="Restore the last (or given) patch journal")
+    parser.add_argument("--force", action="store_true", help="With --undo, also restore files edited since")
     args = parser.parse_args()
     
-    apply_patch(args.target_file, args.patch_file)
+    if args.undo is not None:
+        undo(args.undo or None, args.force)
+    elif args.bundle:
+        apply_bundle(args.bundle, args.jobs)
+    elif args.target_file and args.patch_file:
+        apply_patch(args.target_file, args.patch_file)
+    else:
+        parser.error("give <target_file> <patch_file>, --bundle or --undo")
 
 if __name__ == "__main__":
     main()
@@ -22,16 +22,63 @@ from pathlib import Path
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
+# Flattened entry caches are shared with the context router
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "context-router" / "scripts"))
+from context_router import (  # noqa: E402
+    ResultCache, load_flat, lookup_contains, lookup_prefix, match_entries, read_entries, read_entry_json,
+)
 
-def load_json(filename):
+
+def data_path(filename):
     filepath = DATA_DIR / filename
     if not filepath.exists():
         print(f"Error: {filepath} not found")
         sys.exit(1)
-    with open(filepath, "r", encoding="utf-8") as f:
+    return filepath
+
+
+def load_json(filename):
+    with open(data_path(filename), "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def _matching_names(filename, text):
+    """Names of the entries whose JSON (keys and numbers too) contains text,
+    ignoring case, like searching json.dumps(entry).lower().
+
+    The cached compact JSON only lacks the spaces after ',' and ':', so an
+    entry can match only if every space-free piece of text is in it. Text
+    without ' ', ',' or ':' matches exactly there; otherwise just those
+    candidates are decoded and checked against json.dumps."""
+    flat = load_flat(data_path(filename))
+    needle = text.lower()
+    pieces = [piece for piece in needle.split(" ") if piece]
+    texts = read_entry_json(flat, range(len(flat["entry_json"]) - 1))
+    candidates = [i for i, entry in enumerate(texts) if all(piece in entry.lower() for piece in pieces)]
+    entries = read_entries(flat, candidates)
+    if any(c in needle for c in " ,:"):
+        entries = [entry for entry in entries if needle in json.dumps(entry, ensure_ascii=False).lower()]
+    return [entry["name"] for entry in entries]
+
+
+def find_entry(filename, text):
+    """Entry whose id is text, else the first whose id or name starts with
+    it, else the first whose id or name contains it (None when none does).
+    Uses the cached id/name tables; only the returned entry is decoded."""
+    flat = load_flat(data_path(filename))
+    i = flat["id_table"].get(text)
+    if i is None:
+        hits = lookup_prefix(flat, text) or lookup_contains(flat, text)
+        if not hits:
+            return None
+        i = hits[0]
+    return read_entries(flat, [i])[0]
+
+
+def available_ids(filename):
+    return ", ".join(i for i in load_flat(data_path(filename))["ids"] if isinstance(i, str))
+
+
 def search_industry(domain, query=None):
     """Find industry + pain points + opportunities by domain."""
     industries = load_json("industry_database.json")
@@ -80,28 +127,26 @@ def search_industry(domain, query=None):
 
 def search_archetype(archetype, platform=None):
     """Find product archetype + features + monetization."""
-    archetypes = load_json("product_archetypes.json")
+    flat = load_flat(data_path("product_archetypes.json"))
     results = []
-    arch_lower = archetype.lower()
 
-    for arch in archetypes:
-        if arch_lower in arch["id"].lower() or arch_lower in arch["name"].lower():
-            result = {
-                "archetype": arch["name"],
-                "description": arch["description"],
-                "examples": arch["examples"],
-                "core_features": arch["core_features"],
-                "monetization": arch["monetization"],
-                "complexity": arch["complexity"],
-                "time_estimate": arch["time_estimate"]
-            }
-            if platform:
-                result["platform_match"] = platform in arch.get("platforms", [])
-            results.append(result)
+    for arch in read_entries(flat, lookup_contains(flat, archetype)):
+        result = {
+            "archetype": arch["name"],
+            "description": arch["description"],
+            "examples": arch["examples"],
+            "core_features": arch["core_features"],
+            "monetization": arch["monetization"],
+            "complexity": arch["complexity"],
+            "time_estimate": arch["time_estimate"]
+        }
+        if platform:
+            result["platform_match"] = platform in arch.get("platforms", [])
+        results.append(result)
 
     if platform and not results:
         # Filter by platform
-        for arch in archetypes:
+        for arch in load_json("product_archetypes.json"):
             if platform in arch.get("platforms", []):
                 results.append({
                     "archetype": arch["name"],
@@ -142,12 +187,11 @@ def search_monetization(domain=None):
 
 def get_framework(framework_id):
     """Get details of a brainstorm framework."""
-    frameworks = load_json("brainstorm_frameworks.json")
-    for f in frameworks:
-        if framework_id.lower() in f["id"].lower() or framework_id.lower() in f["name"].lower():
-            return f
+    framework = find_entry("brainstorm_frameworks.json", framework_id)
+    if framework is not None:
+        return framework
     return {"message": f"Framework '{framework_id}' not found. Available: " +
-            ", ".join(f["id"] for f in frameworks)}
+            available_ids("brainstorm_frameworks.json")}
 
 
 def get_features(category=None):
@@ -166,46 +210,58 @@ def get_features(category=None):
 
 def get_platform(platform_id):
     """Get detailed platform guide."""
-    platforms = load_json("platform_guide.json")
-    for p in platforms:
-        if platform_id.lower() in p["id"].lower() or platform_id.lower() in p["name"].lower():
-            return p
+    platform = find_entry("platform_guide.json", platform_id)
+    if platform is not None:
+        return platform
     return {"message": f"Platform '{platform_id}' not found. Available: " +
-            ", ".join(p["id"] for p in platforms)}
+            available_ids("platform_guide.json")}
 
 
 def explore(text):
     """Free text search across all data files."""
-    text_lower = text.lower()
     results = {"industries": [], "archetypes": [], "features": [], "monetization": []}
 
-    # Search industries
-    for ind in load_json("industry_database.json"):
-        if text_lower in json.dumps(ind, ensure_ascii=False).lower():
-            results["industries"].append(ind["name"])
+    # Search industries and archetypes (precomputed text, one check per entry)
+    results["industries"] = _matching_names("industry_database.json", text)
+    results["archetypes"] = _matching_names("product_archetypes.json", text)
 
-    # Search archetypes
-    for arch in load_json("product_archetypes.json"):
-        if text_lower in json.dumps(arch, ensure_ascii=False).lower():
-            results["archetypes"].append(arch["name"])
-
-    # Search features
-    features = load_json("feature_ideas.json")
-    for cat, items in features.items():
-        matched = [i for i in items if text_lower in i.lower()]
+    # Search features: every matching item, located by its field path
+    flat = load_flat(data_path("feature_ideas.json"))
+    matches = match_entries(flat, text, all_fields=True)
+    for entry, (_, fields) in zip(read_entries(flat, [i for i, _ in matches]), matches):
+        (cat, items), = entry.items()
+        matched = [items[int(f[len(cat) + 1:-1])] for f in fields if f != cat]
         if matched:
             results["features"].extend(matched[:5])
 
     # Search monetization
-    for m in load_json("monetization_models.json"):
-        if text_lower in json.dumps(m, ensure_ascii=False).lower():
-            results["monetization"].append(m["name"])
+    results["monetization"] = _matching_names("monetization_models.json", text)
 
     # Clean empty
     results = {k: v for k, v in results.items() if v}
     return results or {"message": f"No results for '{text}'"}
 
 
+def answer(args):
+    """Run the requested lookup and return it as indented JSON"""
+    if args.domain:
+        result = search_industry(args.domain, args.query)
+    elif args.archetype:
+        result = search_archetype(args.archetype, args.platform)
+    elif args.monetization:
+        result = search_monetization(args.domain)
+    elif args.framework:
+        result = get_framework(args.framework)
+    elif args.features is not None:
+        result = get_features(args.features if args.features else None)
+    elif args.platform:
+        result = get_platform(args.platform)
+    else:
+        result = explore(args.explore)
+
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Meta Thinker Idea Engine — Zero-Token Data Retrieval"
@@ -218,28 +274,23 @@ def main():
     parser.add_argument("--features", help="Feature category (e.g. auth, payment, ai)")
     parser.add_argument("--platform", help="Platform guide (e.g. web, mobile, desktop)")
     parser.add_argument("--explore", help="Free-text search across all data")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the shared query result cache")
 
     args = parser.parse_args()
 
-    if args.domain:
-        result = search_industry(args.domain, args.query)
-    elif args.archetype:
-        result = search_archetype(args.archetype, args.platform)
-    elif args.monetization:
-        result = search_monetization(args.domain)
-    elif args.framework:
-        result = get_framework(args.framework)
-    elif args.features is not None:
-        result = get_features(args.features if args.features else None)
-    elif args.platform:
-        result = get_platform(args.platform)
-    elif args.explore:
-        result = explore(args.explore)
-    else:
+    if not any([args.domain, args.archetype, args.monetization, args.framework,
+                args.features is not None, args.platform, args.explore]):
         parser.print_help()
         return
 
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    # Same on-disk result cache as the context router, keyed on this skill's data
+    cache = ResultCache(enabled=not args.no_cache)
+    params = {name: value for name, value in vars(args).items() if name != "no_cache"}
+    files = [str(path) for path in DATA_DIR.glob("*.json")] + [str(Path(__file__).resolve())]
+    print(cache.cached("idea_engine", params, files, lambda: answer(args)))
+    summary = cache.summary()
+    if summary:
+        print(summary, file=sys.stderr)
 
 
 if __name__ == "__main__":
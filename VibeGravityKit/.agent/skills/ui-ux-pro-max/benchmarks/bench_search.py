@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Benchmarks - search latency and relevance regression suite
+
+Measures p50/p95/p99 latency of core.search (per domain), core.search_stack
+(per stack) and generate_design_system on the real CSVs and on synthetic
+corpora scaled from them, then checks a fixed relevance set so a speedup
+cannot silently change rankings.
+
+Usage:
+    python bench_search.py                              # scales 1,10,100 vs baseline.json
+    python bench_search.py --scales 1,10,100,1000 -o bench.json
+    python bench_search.py --tolerance 0.25 --baseline other.json
+    python bench_search.py --update-baseline            # rewrite baseline.json
+
+Exit status is 1 when a relevance check fails or when p95 latency (the
+geometric mean per scale and API) regresses by more than --tolerance
+against the baseline: the committed baseline.json unless --baseline names
+another. Baseline latencies are scaled by the ratio of a fixed CPU
+calibration run, so a baseline recorded on one machine applies on another.
+"""
+
+import argparse
+import csv
+import json
+import math
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "scripts"))
+
+import core  # noqa: E402
+import design_system  # noqa: E402
+
+RELEVANCE_FILE = BENCH_DIR / "relevance.json"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+# p95s below this are timer noise; they are compared as this value
+NOISE_MS = 0.25
+DEFAULT_SCALES = "1,10,100"
+REASONING_FILE = design_system.REASONING_FILE
+
+# Generic queries mixed into every domain's latency run
+LATENCY_QUERIES = [
+    "saas dashboard", "modern minimal clean", "dark mode", "mobile app accessibility",
+    "ecommerce checkout", "animation hover", "luxury elegant", "data visualization",
+    "glassmorphism", "zzz nonexistent",
+]
+
+
+# ============ SYNTHETIC DATA ============
+def _scale_csv(src, dst, scale, rng):
+    """Write src to dst with (scale - 1) synthetic rows per original row.
+
+    Every synthetic cell is copied from a random original row's same column,
+    so vocabulary and field lengths follow the real distribution.
+    """
+    with open(src, 'r', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    header, body = rows[0], [r for r in rows[1:] if r]
+    with open(dst, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(body)
+        for _ in range(len(body) * (scale - 1)):
+            row = []
+            for i in range(len(header)):
+                source = rng.choice(body)
+                row.append(source[i] if i < len(source) else "")
+            writer.writerow(row)
+
+
+def build_synthetic_data(scale, seed=42):
+    """Create a temporary DATA_DIR with every CSV scaled by scale"""
+    rng = random.Random(seed)
+    tmp = Path(tempfile.mkdtemp(prefix=f"uiux-bench-{scale}x-"))
+    files = [c["file"] for c in core.CSV_CONFIG.values()] + [c["file"] for c in core.STACK_CONFIG.values()]
+    for rel in files:
+        src = core.DATA_DIR / rel
+        if src.exists():
+            (tmp / rel).parent.mkdir(parents=True, exist_ok=True)
+            _scale_csv(src, tmp / rel, scale, rng)
+    if (core.DATA_DIR / REASONING_FILE).exists():
+        shutil.copy2(core.DATA_DIR / REASONING_FILE, tmp / REASONING_FILE)
+    return tmp
+
+
+def use_data_dir(path):
+    """Point core and design_system at another data directory"""
+    core.DATA_DIR = path
+    design_system.DATA_DIR = path
+    design_system.GENERATE_CACHE_DIR = path / core.INDEX_DIR_NAME / "design-system"
+    core._index_cache.clear()
+
+
+# ============ MEASUREMENT ============
+def calibrate(rounds=5):
+    """Best-of-rounds time (ms) of a fixed tokenize/sort/dict workload, a
+    rough measure of this machine's current speed for scaling baselines"""
+    words = [f"w{(i * 7919) % 1000}" for i in range(20000)]
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        counts = {}
+        for word in " ".join(words).split():
+            counts[word] = counts.get(word, 0) + 1
+        sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4)
+
+
+def percentiles(samples):
+    """Nearest-rank p50/p95/p99 plus mean, in milliseconds"""
+    ordered = sorted(samples)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "n": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(pick(50), 4),
+        "p95": round(pick(95), 4),
+        "p99": round(pick(99), 4),
+    }
+
+
+def _time_calls(fn, args_list, repeat):
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _time_cold(fn, args):
+    """First call with an empty in-process cache (index load or build + query)"""
+    start = time.perf_counter()
+    fn(*args)
+    return round((time.perf_counter() - start) * 1000, 4)
+
+
+def bench_scale(relevance, repeat):
+    """Latency stats for the data directory currently in use"""
+    report = {"search": {}, "search_stack": {}, "generate_design_system": {}}
+
+    for domain in core.CSV_CONFIG:
+        queries = [c["query"] for c in relevance["search"] if c["domain"] == domain] + LATENCY_QUERIES
+        args = [(q, domain, core.MAX_RESULTS) for q in queries]
+        cold_ms = _time_cold(core.search, args[0])
+        stats = percentiles(_time_calls(core.search, args, repeat))
+        report["search"][domain] = {"cold_ms": cold_ms, **stats}
+
+    for stack in core.AVAILABLE_STACKS:
+        queries = [c["query"] for c in relevance["search_stack"] if c["stack"] == stack] + LATENCY_QUERIES
+        args = [(q, stack, core.MAX_RESULTS) for q in queries]
+        cold_ms = _time_cold(core.search_stack, args[0])
+        stats = percentiles(_time_calls(core.search_stack, args, repeat))
+        report["search_stack"][stack] = {"cold_ms": cold_ms, **stats}
+
+    queries = [c["query"] for c in relevance["generate_design_system"]]
+    uncached = [(q, None, "ascii", False, None, None, False) for q in queries]
+    cached = [(q, None, "ascii", False, None, None, True) for q in queries]
+    report["generate_design_system"]["uncached"] = percentiles(
+        _time_calls(design_system.generate_design_system, uncached, repeat))
+    _time_calls(design_system.generate_design_system, cached, 1)
+    report["generate_design_system"]["cached"] = percentiles(
+        _time_calls(design_system.generate_design_system, cached, repeat))
+    return report
+
+
+# ============ RELEVANCE ============
+def check_relevance(relevance):
+    """Compare ranked results on the real CSVs with the expected rows"""
+    failures, total = [], 0
+
+    for case in relevance["search"]:
+        total += 1
+        rows = core.search(case["query"], case["domain"], len(case["expected"]))["results"]
+        got = [row.get(case["field"]) for row in rows]
+        if got != case["expected"]:
+            failures.append({**case, "got": got})
+
+    for case in relevance["search_stack"]:
+        total += 1
+        rows = core.search_stack(case["query"], case["stack"], len(case["expected"]))["results"]
+        got = [row.get(case["field"]) for row in rows]
+        if got != case["expected"]:
+            failures.append({**case, "got": got})
+
+    generator = design_system.DesignSystemGenerator()
+    for case in relevance["generate_design_system"]:
+        total += 1
+        ds = generator.generate(case["query"], use_cache=False)
+        got = {
+            "category": ds["category"],
+            "style": ds["style"]["name"],
+            "heading": ds["typography"]["heading"],
+            "primary": ds["colors"]["primary"],
+        }
+        if got != case["expected"]:
+            failures.append({**case, "got": got})
+
+    return {"total": total, "passed": total - len(failures), "failures": failures}
+
+
+# ============ BASELINE COMPARISON ============
+def compare_baseline(results, baseline, tolerance):
+    """Regressions against a baseline: per corpus scale and API, the
+    geometric mean of the p95 ratios exceeding 1 + tolerance (single p95s
+    are too noisy to judge alone), and a relevance pass count below the
+    baseline's"""
+    regressions = []
+    base_relevance = baseline.get("relevance", {})
+    if results["relevance"]["passed"] < base_relevance.get("passed", 0):
+        regressions.append({
+            "api": "relevance", "passed": results["relevance"]["passed"],
+            "baseline_passed": base_relevance["passed"],
+        })
+
+    calibration = results["meta"].get("calibration_ms")
+    base_calibration = baseline.get("meta", {}).get("calibration_ms")
+    speed = calibration / base_calibration if calibration and base_calibration else 1.0
+    for scale, report in results["latency"].items():
+        base_report = baseline.get("latency", {}).get(scale, {})
+        for api, entries in report.items():
+            ratios = {}
+            for name, stats in entries.items():
+                base = base_report.get(api, {}).get(name)
+                if base and base.get("p95"):
+                    # Sub-NOISE_MS timings are compared as NOISE_MS
+                    ratios[name] = max(stats["p95"], NOISE_MS) / max(base["p95"] * speed, NOISE_MS)
+            if not ratios:
+                continue
+            mean = math.exp(sum(math.log(r) for r in ratios.values()) / len(ratios))
+            if mean > 1 + tolerance:
+                worst = max(ratios, key=ratios.get)
+                regressions.append({
+                    "scale": scale, "api": api, "ratio": round(mean, 3), "worst": worst,
+                    "p95": entries[worst]["p95"],
+                    "baseline_p95": round(base_report[api][worst]["p95"] * speed, 4),
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UI Pro Max search benchmarks")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated corpus scales (1 = real CSVs)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of each query set")
+    parser.add_argument("--output", "-o", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", "-b", default=str(BASELINE_FILE),
+                        help="Baseline JSON to compare p95 latency and relevance against (default: baseline.json)")
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the baseline comparison")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help=f"Write the results to {BASELINE_FILE.name} instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed mean p95 slowdown vs baseline (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    with open(RELEVANCE_FILE, 'r', encoding='utf-8') as f:
+        relevance = json.load(f)
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    real_dir = core.DATA_DIR
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": core.np is not None,
+            "repeat": args.repeat,
+            "scales": scales,
+        },
+        "latency": {},
+    }
+
+    # Calibrated around every scale: the median tracks the machine's speed during the run
+    calibrations = [calibrate()]
+    for scale in scales:
+        print(f"⏱️  Benchmarking {scale}x corpus...", file=sys.stderr)
+        data_dir = real_dir if scale == 1 else build_synthetic_data(scale)
+        try:
+            use_data_dir(data_dir)
+            results["latency"][f"{scale}x"] = bench_scale(relevance, args.repeat)
+        finally:
+            use_data_dir(real_dir)
+            if data_dir != real_dir:
+                shutil.rmtree(data_dir, ignore_errors=True)
+        calibrations.append(calibrate())
+    results["meta"]["calibration_ms"] = sorted(calibrations)[len(calibrations) // 2]
+
+    results["relevance"] = check_relevance(relevance)
+
+    failed = bool(results["relevance"]["failures"])
+    compare = not (args.no_baseline or args.update_baseline)
+    if compare:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read baseline {args.baseline}: {e}", file=sys.stderr)
+            sys.exit(1)
+        results["regressions"] = compare_baseline(results, baseline, args.tolerance)
+        failed = failed or bool(results["regressions"])
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        if failed:
+            print("❌ Relevance checks failed; baseline not updated", file=sys.stderr)
+        else:
+            BASELINE_FILE.write_text(output + "\n", encoding='utf-8')
+            print(f"💾 Baseline saved to {BASELINE_FILE}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"💾 Results saved to {args.output}", file=sys.stderr)
+    elif not args.update_baseline:
+        print(output)
+
+    rel = results["relevance"]
+    print(f"🎯 Relevance: {rel['passed']}/{rel['total']} passed", file=sys.stderr)
+    if compare:
+        print(f"📈 Regressions vs baseline: {len(results['regressions'])}", file=sys.stderr)
+        for reg in results["regressions"]:
+            if reg["api"] == "relevance":
+                print(f"   relevance: {reg['passed']} passed < baseline {reg['baseline_passed']}", file=sys.stderr)
+            else:
+                print(f"   {reg['scale']} {reg['api']}: p95 x{reg['ratio']} vs baseline (worst: {reg['worst']} "
+                      f"{reg['p95']} ms vs {reg['baseline_p95']} ms)", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,41 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
 import csv
+import hashlib
+import heapq
+import io
+import os
+import pickle
 import re
+import threading
+from bisect import bisect_right
 from pathlib import Path
 from math import log
 from collections import defaultdict
 
+try:
+    import numpy as np
+except ImportError:  # optional: search_many() falls back to pure Python
+    np = None
+
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
 
+# Compiled indexes are cached here and rebuilt when the source CSV changes
+INDEX_DIR_NAME = ".cache"
+INDEX_VERSION = 6
+VOCABULARY_NAME = "_vocabulary"
+
+# Typo tolerance: query tokens missing from every index's vocabulary are
+# matched to vocabulary terms that share enough character trigrams and are
+# only a few edits away. A token known to any domain or stack is a real word
+# and is never rewritten, even where the searched index lacks it.
+FUZZY_MIN_OVERLAP = 0.35
+FUZZY_MAX_EDITS = 2
+FUZZY_MAX_TERMS = 3
+FUZZY_MIN_LENGTH = 5
+
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
@@ -91,10 +117,22 @@ _STACK_COLS = {
 
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
+# Pseudo domain/stack name for federated search over every file at once
+ALL = "all"
+
 
 # ============ BM25 IMPLEMENTATION ============
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search.
+
+    Scoring walks an inverted index (term -> [(doc, tf, weight), ...]) so a
+    query only touches documents that contain at least one of its terms.
+    Each posting carries its precomputed BM25 weight.
+
+    A character-trigram index over the vocabulary (trigram -> [term, ...])
+    is built alongside, so misspelled query tokens ("glassmorphsm") are
+    scored through their closest vocabulary terms instead of matching nothing.
+    """
 
     def __init__(self, k1=1.5, b=0.75):
         self.k1 = k1
@@ -104,7 +142,12 @@ class BM25:
         self.avgdl = 0
         self.idf = {}
         self.doc_freqs = defaultdict(int)
+        self.postings = {}
+        self.trigrams = {}
+        self.gram_counts = {}
         self.N = 0
+        self._matrix = None
+        self._fuzzy_cache = {}
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
@@ -120,71 +163,561 @@ class BM25:
         self.doc_lengths = [len(doc) for doc in self.corpus]
         self.avgdl = sum(self.doc_lengths) / self.N
 
+        term_freqs = []
         for doc in self.corpus:
-            seen = set()
+            freqs = defaultdict(int)
             for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+                freqs[word] += 1
+            term_freqs.append(freqs)
+            for word in freqs:
+                self.doc_freqs[word] += 1
 
         for word, freq in self.doc_freqs.items():
             self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
 
+        postings = defaultdict(list)
+        for idx, freqs in enumerate(term_freqs):
+            for word, tf in freqs.items():
+                postings[word].append((idx, tf, self._weight(word, tf, idx)))
+        self.postings = dict(postings)
+        self._fit_trigrams()
+
+    def _fit_trigrams(self):
+        """Index every vocabulary term by its character trigrams"""
+        trigrams = defaultdict(list)
+        for term in sorted(self.postings):
+            grams = _trigrams(term)
+            self.gram_counts[term] = len(grams)
+            for gram in grams:
+                trigrams[gram].append(term)
+        self.trigrams = dict(trigrams)
+
+    def _weight(self, token, tf, idx):
+        """BM25 contribution of one term occurrence count to one document"""
+        numerator = tf * (self.k1 + 1)
+        denominator = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / self.avgdl)
+        return self.idf[token] * numerator / denominator
+
+    def state(self):
+        """Fitted model as plain data, suitable for pickling to disk"""
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_lengths": self.doc_lengths,
+            "avgdl": self.avgdl,
+            "idf": self.idf,
+            "postings": self.postings,
+            "trigrams": self.trigrams,
+            "gram_counts": self.gram_counts,
+            "N": self.N,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a fitted model from state() without re-tokenizing"""
+        bm25 = cls(state["k1"], state["b"])
+        bm25.doc_lengths = state["doc_lengths"]
+        bm25.avgdl = state["avgdl"]
+        bm25.idf = state["idf"]
+        bm25.postings = state["postings"]
+        bm25.trigrams = state["trigrams"]
+        bm25.gram_counts = state["gram_counts"]
+        bm25.doc_freqs = defaultdict(int, {w: len(p) for w, p in bm25.postings.items()})
+        bm25.N = state["N"]
+        return bm25
+
+    def fuzzy_terms(self, token):
+        """Vocabulary terms close to an unknown token as (term, similarity).
+
+        Terms sharing at least FUZZY_MIN_OVERLAP of their trigrams are the
+        candidates; those with the same first letter and within
+        FUZZY_MAX_EDITS edits (1 below 8 letters) are kept, closest
+        FUZZY_MAX_TERMS first. similarity is 1 - edits / length, so a near
+        miss scores almost like the real term.
+        """
+        matches = self._fuzzy_cache.get(token)
+        if matches is not None:
+            return matches
+        matches = []
+        if len(token) >= FUZZY_MIN_LENGTH and not token.isdigit():
+            max_edits = 1 if len(token) < 8 else FUZZY_MAX_EDITS
+            grams = _trigrams(token)
+            shared = defaultdict(int)
+            for gram in grams:
+                for term in self.trigrams.get(gram, ()):
+                    shared[term] += 1
+            candidates = []
+            for term, n in shared.items():
+                if (term[0] == token[0] and abs(len(term) - len(token)) <= max_edits
+                        and n / (len(grams) + self.gram_counts[term] - n) >= FUZZY_MIN_OVERLAP):
+                    edits = _edit_distance(token, term, max_edits)
+                    if edits <= max_edits:
+                        candidates.append((edits, -n, term))
+            for edits, _, term in sorted(candidates)[:FUZZY_MAX_TERMS]:
+                matches.append((term, 1 - edits / max(len(token), len(term))))
+        self._fuzzy_cache[token] = matches
+        return matches
+
+    def is_typo(self, token):
+        """A token worth fuzzy matching: unknown here and in every other index"""
+        return (token not in self.postings and len(token) >= FUZZY_MIN_LENGTH
+                and not token.isdigit() and token not in known_words())
+
+    def query_terms(self, query):
+        """Tokenize query into (term, factor) pairs to score.
+
+        Known tokens count fully; likely typos are replaced by their fuzzy
+        matches, each weighted by its similarity. Real words this index
+        lacks simply match nothing.
+        """
+        terms = []
+        for token in self.tokenize(query):
+            if token in self.postings:
+                terms.append((token, 1.0))
+            elif self.is_typo(token):
+                terms.extend(self.fuzzy_terms(token))
+        return terms
+
+    def corrections(self, query):
+        """Typo tokens mapped to the vocabulary terms used instead"""
+        return {token: [term for term, _ in self.fuzzy_terms(token)]
+                for token in self.tokenize(query)
+                if self.is_typo(token) and self.fuzzy_terms(token)}
+
+    def _accumulate(self, query):
+        """Sum BM25 contributions for docs containing any query term"""
+        scores = {}
+        for term, factor in self.query_terms(query):
+            for idx, _, weight in self.postings[term]:
+                scores[idx] = scores.get(idx, 0) + weight * factor
+        return scores
+
+    def top_k(self, query, k):
+        """Return up to k (doc_index, score) pairs with score > 0, best first.
+
+        Ties keep corpus order, matching score().
+        """
+        scores = self._accumulate(query)
+        hits = ((idx, score) for idx, score in scores.items() if score > 0)
+        return heapq.nlargest(k, hits, key=lambda x: (x[1], -x[0]))
+
     def score(self, query):
         """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        scores = self._accumulate(query)
+        return sorted(((idx, scores.get(idx, 0)) for idx in range(self.N)),
+                      key=lambda x: x[1], reverse=True)
+
+    def matrix(self):
+        """Term-document weights in CSR form: (vocab, indptr, indices, data).
+
+        Row vocab[term] holds that term's postings; built once per model.
+        """
+        if self._matrix is None:
+            vocab, indptr, indices, data = {}, [0], [], []
+            for term in sorted(self.postings):
+                vocab[term] = len(vocab)
+                for idx, _, weight in self.postings[term]:
+                    indices.append(idx)
+                    data.append(weight)
+                indptr.append(len(indices))
+            self._matrix = (vocab, np.array(indptr, dtype=np.int64),
+                            np.array(indices, dtype=np.int64), np.array(data, dtype=np.float64))
+        return self._matrix
+
+    def top_k_many(self, queries, k):
+        """top_k() for a batch of queries, scored in one vectorized pass.
+
+        The (queries x terms) count matrix is multiplied by the CSR weight
+        matrix with a single gather + scatter-add. Occurrences are applied in
+        query-token order, so scores are bit-identical to top_k(). Without
+        NumPy this simply loops over top_k().
+        """
+        if np is None or self.N == 0:
+            return [self.top_k(query, k) for query in queries]
+
+        vocab, indptr, indices, data = self.matrix()
+        query_rows, term_rows, factors = [], [], []
+        for qi, query in enumerate(queries):
+            for term, factor in self.query_terms(query):
+                query_rows.append(qi)
+                term_rows.append(vocab[term])
+                factors.append(factor)
+        if not term_rows:
+            return [[] for _ in queries]
+
+        term_rows = np.array(term_rows, dtype=np.int64)
+        starts = indptr[term_rows]
+        lengths = indptr[term_rows + 1] - starts
+        # Positions of every posting of every query term, row after row
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        scores = np.zeros((len(queries), self.N))
+        weights = data[offsets] * np.repeat(np.array(factors), lengths)
+        np.add.at(scores, (np.repeat(query_rows, lengths), indices[offsets]), weights)
+
+        results = []
+        for row in scores:
+            hits = np.flatnonzero(row > 0)
+            order = np.lexsort((hits, -row[hits]))[:k]
+            results.append([(int(hits[i]), float(row[hits[i]])) for i in order])
+        return results
+
+
+def _trigrams(term):
+    """Character trigrams of a term padded with one space on each side"""
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps cost 1).
+
+    Stops early and returns limit + 1 once every alignment exceeds limit.
+    """
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+# ============ PERSISTENT INDEX ============
+_index_cache = {}
+_index_lock = threading.Lock()
+_hash_cache = {}
+
+
+def _file_fingerprint(filepath):
+    """Cheap change detector: (mtime_ns, size)"""
+    st = os.stat(filepath)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_hash(filepath):
+    """Content hash, used when mtime changed but the data may not have"""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def file_digest(filepath):
+    """Content hash of a data file, memoized per (mtime, size) in-process"""
+    key = (str(filepath), _file_fingerprint(filepath))
+    digest = _hash_cache.get(key)
+    if digest is None:
+        digest = _hash_cache[key] = _file_hash(filepath)
+    return digest
+
+
+def _index_path(name):
+    """Index file for a source name, e.g. data/.cache/stacks__react.idx"""
+    return DATA_DIR / INDEX_DIR_NAME / f"{name}.idx"
+
+
+def _source_name(filepath):
+    """Cache name for a single CSV: its path under DATA_DIR, '/' -> '__'"""
+    rel = Path(filepath).resolve().relative_to(DATA_DIR.resolve())
+    return "__".join(rel.with_suffix("").parts)
+
+
+def _iter_records(f, hasher, end):
+    """Stream CSV records from binary file f as (byte_offset, values).
+
+    Only one record is held at a time. hasher is fed every byte read and
+    end[0] is left at the end of the last record, so any row can later be
+    re-read with a single seek. Newlines are translated like text-mode open().
+    """
+    consumed = [0]
+
+    def lines():
+        for chunk in f:
+            hasher.update(chunk)
+            for line in chunk.splitlines(keepends=True):
+                consumed[0] += len(line)
+                yield line.rstrip(b"\r\n").decode("utf-8") + "\n"
+
+    reader = csv.reader(lines())
+    while True:
+        pos = consumed[0]
+        values = next(reader, None)
+        if values is None:
+            break
+        if values != []:
+            yield pos, values
+    end[0] = consumed[0]
+
+
+def _cell(values, col_index):
+    """Value of a column like csv.DictReader: None when the row is short"""
+    if col_index is None:
+        return ""
+    return values[col_index] if col_index < len(values) else None
+
+
+def _build_index(sources):
+    """Tokenize CSVs and fit one BM25 over all of them.
+
+    sources is a list of (label, filepath, search_cols). Each source becomes
+    a "part" of the index; documents are numbered consecutively across parts
+    and part["start"] is the first document id of that part.
+
+    Parts are columnar: the search columns are kept as value lists, every
+    other column stays in the CSV and is read back through part["offsets"]
+    only for rows that are actually returned.
+    """
+    parts, documents = [], []
+    for label, filepath, search_cols in sources:
+        hasher = hashlib.sha1()
+        end = [0]
+        with open(filepath, 'rb') as f:
+            records = _iter_records(f, hasher, end)
+            _, header = next(records, (0, []))
+            positions = {col: i for i, col in enumerate(header)}
+            col_indexes = [positions.get(col) for col in search_cols]
+            columns = {col: [] for col in search_cols if col in positions}
+            offsets = []
+            start = len(documents)
+            for pos, values in records:
+                offsets.append(pos)
+                cells = [_cell(values, i) for i in col_indexes]
+                for col, value in zip(search_cols, cells):
+                    if col in columns:
+                        columns[col].append(value)
+                documents.append(" ".join(str(value) for value in cells))
+            offsets.append(end[0])
+        parts.append({
+            "label": label,
+            "file": str(filepath),
+            "search_cols": list(search_cols),
+            "fingerprint": _file_fingerprint(filepath),
+            "hash": hasher.hexdigest(),
+            "header": header,
+            "columns": columns,
+            "offsets": offsets,
+            "start": start,
+        })
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
-
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
-
-            scores.append((idx, score))
-
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+    bm25 = BM25()
+    bm25.fit(documents)
+    return {"version": INDEX_VERSION, "parts": parts, "bm25": bm25.state()}
+
+
+def _save_index(path, index):
+    """Write atomically; a read-only install simply skips the disk cache"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # pid + thread id: search_many and known_words() build indexes from pool threads
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _load_index(path):
+    try:
+        with open(path, 'rb') as f:
+            index = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def _compiled_index(name, sources):
+    """Return the compiled index for a set of CSVs, loading or rebuilding lazily.
+
+    Lookup order: in-process cache, then data/.cache/<name>.idx, then a fresh
+    build. A part is stale when its CSV's mtime/size changed *and* its content
+    hash differs; a touched-but-identical file only refreshes the stored
+    fingerprint.
+    """
+    layout = [(label, str(filepath), list(cols)) for label, filepath, cols in sources]
+    fingerprints = [_file_fingerprint(filepath) for _, filepath, _ in sources]
+
+    index = _index_cache.get(name)
+    if index is not None and index["_layout"] == layout and index["_fingerprints"] == fingerprints:
+        return index
+
+    with _index_lock:
+        index = _index_cache.get(name)
+        if index is not None and index["_layout"] == layout and index["_fingerprints"] == fingerprints:
+            return index
+        return _refresh_index(name, sources, layout, fingerprints)
+
+
+def _refresh_index(name, sources, layout, fingerprints):
+    """Load name from disk or rebuild it; caller holds _index_lock"""
+    path = _index_path(name)
+    index = _load_index(path)
+    if index is None or [(p["label"], p["file"], p["search_cols"]) for p in index["parts"]] != layout:
+        index = _build_index(sources)
+        _save_index(path, index)
+    elif [p["fingerprint"] for p in index["parts"]] != fingerprints:
+        if all(p["hash"] == _file_hash(p["file"]) for p in index["parts"]):
+            for part, fingerprint in zip(index["parts"], fingerprints):
+                part["fingerprint"] = fingerprint
+        else:
+            index = _build_index(sources)
+        _save_index(path, index)
+
+    index["_bm25"] = BM25.from_state(index["bm25"])
+    index["_starts"] = [p["start"] for p in index["parts"]]
+    index["_layout"] = layout
+    index["_fingerprints"] = fingerprints
+    _index_cache[name] = index
+    return index
+
+
+def cached(name, filepath, build):
+    """Return build(filepath) for a data file, persisted as data/.cache/<name>.idx.
+
+    The same fingerprint/hash invalidation as the search indexes applies, so
+    derived lookup tables are rebuilt only when the file's content changes.
+    """
+    filepath = Path(filepath)
+    fingerprint = _file_fingerprint(filepath)
+    entry = _index_cache.get(name)
+    if entry is not None and entry["file"] == str(filepath) and entry["fingerprint"] == fingerprint:
+        return entry["value"]
+
+    with _index_lock:
+        path = _index_path(name)
+        entry = _load_index(path)
+        if entry is None or entry.get("file") != str(filepath):
+            entry = None
+        elif entry["fingerprint"] != fingerprint:
+            if entry["hash"] == _file_hash(filepath):
+                entry["fingerprint"] = fingerprint
+                _save_index(path, entry)
+            else:
+                entry = None
+        if entry is None:
+            entry = {
+                "version": INDEX_VERSION,
+                "file": str(filepath),
+                "fingerprint": fingerprint,
+                "hash": _file_hash(filepath),
+                "value": build(filepath),
+            }
+            _save_index(path, entry)
+        _index_cache[name] = entry
+        return entry["value"]
+
+
+def warm(domains=None):
+    """Load the indexes for domains (default: all) so later searches,
+    including concurrent ones, start from a hot in-process cache"""
+    for domain in domains or CSV_CONFIG:
+        config = CSV_CONFIG[domain]
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            get_index(filepath, config["search_cols"])
+
+
+def get_index(filepath, search_cols):
+    """Return the compiled single-CSV index for filepath"""
+    filepath = Path(filepath)
+    name = _source_name(filepath)
+    return _compiled_index(name, [(name, filepath, search_cols)])
+
+
+def known_words():
+    """Every term of every domain and stack index (persisted as
+    data/.cache/_vocabulary.idx, rebuilt when any CSV changes). Only loaded
+    when a query token is missing from the index being searched."""
+    sources = [(DATA_DIR / c["file"], c["search_cols"]) for c in CSV_CONFIG.values()]
+    sources += [(DATA_DIR / c["file"], _STACK_COLS["search_cols"]) for c in STACK_CONFIG.values()]
+    sources = [(filepath, cols) for filepath, cols in sources if filepath.exists()]
+    fingerprints = [(str(filepath), _file_fingerprint(filepath)) for filepath, _ in sources]
+
+    entry = _index_cache.get(VOCABULARY_NAME)
+    if entry is not None and entry["fingerprints"] == fingerprints:
+        return entry["value"]
+
+    path = _index_path(VOCABULARY_NAME)
+    entry = _load_index(path)
+    if entry is None or entry.get("fingerprints") != fingerprints:
+        words = set()
+        for filepath, cols in sources:
+            words.update(get_index(filepath, cols)["_bm25"].postings)
+        entry = {"version": INDEX_VERSION, "fingerprints": fingerprints, "value": frozenset(words)}
+        _save_index(path, entry)
+    _index_cache[VOCABULARY_NAME] = entry
+    return entry["value"]
+
+
+def _read_rows(index, doc_ids, output_cols):
+    """Materialize only the requested rows and columns.
+
+    output_cols is a list of columns, or a dict of part label -> columns.
+    Search columns come straight from the index; anything else is parsed
+    from the row's byte range in the CSV. Returns (part, row_dict) pairs in
+    doc_ids order, with row_dict holding the output columns the file has.
+    """
+    rows = []
+    handles = {}
+    try:
+        for doc in doc_ids:
+            part = index["parts"][bisect_right(index["_starts"], doc) - 1]
+            idx = doc - part["start"]
+            columns = part["columns"]
+            positions = {col: i for i, col in enumerate(part["header"])}
+            cols = output_cols[part["label"]] if isinstance(output_cols, dict) else output_cols
+            wanted = [col for col in cols if col in positions]
+
+            values = None
+            if any(col not in columns for col in wanted):
+                offsets = part["offsets"]
+                f = handles.get(part["file"])
+                if f is None:
+                    f = handles[part["file"]] = open(part["file"], 'rb')
+                f.seek(offsets[idx])
+                chunk = f.read(offsets[idx + 1] - offsets[idx]).decode("utf-8")
+                chunk = chunk.replace("\r\n", "\n").replace("\r", "\n")
+                values = next(csv.reader(io.StringIO(chunk)), [])
+
+            row = {}
+            for col in wanted:
+                row[col] = columns[col][idx] if col in columns else _cell(values, positions[col])
+            rows.append((part, row))
+    finally:
+        for f in handles.values():
+            f.close()
+    return rows
 
 
 # ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load CSV and return list of dicts"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
-
-
 def _search_csv(filepath, search_cols, output_cols, query, max_results):
     """Core search function using BM25"""
     if not filepath.exists():
         return []
 
-    data = _load_csv(filepath)
+    index = get_index(filepath, search_cols)
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+    # Get top results with score > 0
+    hits = [idx for idx, _ in index["_bm25"].top_k(query, max_results)]
+    return _project_rows(index, hits, output_cols)
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+def _project_rows(index, hits, output_cols):
+    """Read the output columns of the hit rows"""
+    return [row for _, row in _read_rows(index, hits, output_cols)]
 
-    return results
+
+def _add_corrections(result, index, query):
+    """Report fuzzy-matched query tokens so callers see what was searched"""
+    corrections = index["_bm25"].corrections(query)
+    if corrections:
+        result["corrections"] = corrections
+    return result
 
 
 def detect_domain(query):
@@ -213,6 +746,8 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     """Main search function with auto-domain detection"""
     if domain is None:
         domain = detect_domain(query)
+    elif domain == ALL:
+        return search_all(query, max_results)
 
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
     filepath = DATA_DIR / config["file"]
@@ -222,17 +757,19 @@ def search(query, domain=None, max_results=MAX_RESULTS):
 
     results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
 
-    return {
+    return _add_corrections({
         "domain": domain,
         "query": query,
         "file": config["file"],
         "count": len(results),
         "results": results
-    }
+    }, get_index(filepath, config["search_cols"]), query)
 
 
 def search_stack(query, stack, max_results=MAX_RESULTS):
     """Search stack-specific guidelines"""
+    if stack == ALL:
+        return search_all_stacks(query, max_results)
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
 
@@ -243,11 +780,134 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
 
     results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
 
-    return {
+    return _add_corrections({
         "domain": "stack",
         "stack": stack,
         "query": query,
         "file": STACK_CONFIG[stack]["file"],
         "count": len(results),
         "results": results
+    }, get_index(filepath, _STACK_COLS["search_cols"]), query)
+
+
+def search_many(queries, domains=None, max_results=MAX_RESULTS):
+    """Score a batch of queries against one or more domains at once.
+
+    Each domain's BM25 weights are scored for the whole batch in a single
+    vectorized pass (NumPy when available, pure Python otherwise).
+
+    Args:
+        queries: list of query strings
+        domains: domain name or list of names (defaults to all CSV_CONFIG domains)
+        max_results: results per query per domain
+
+    Returns:
+        One dict per query mapping domain -> search()-shaped result
+    """
+    if domains is None:
+        domains = list(CSV_CONFIG.keys())
+    elif isinstance(domains, str):
+        domains = [domains]
+
+    batch = [{} for _ in queries]
+    for domain in domains:
+        config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+        filepath = DATA_DIR / config["file"]
+
+        if not filepath.exists():
+            for out in batch:
+                out[domain] = {"error": f"File not found: {filepath}", "domain": domain}
+            continue
+
+        index = get_index(filepath, config["search_cols"])
+        ranked = index["_bm25"].top_k_many(queries, max_results)
+        for query, hits, out in zip(queries, ranked, batch):
+            results = _project_rows(index, [idx for idx, _ in hits], config["output_cols"])
+            out[domain] = _add_corrections({
+                "domain": domain,
+                "query": query,
+                "file": config["file"],
+                "count": len(results),
+                "results": results
+            }, index, query)
+    return batch
+
+
+# ============ FEDERATED SEARCH ============
+def _federated_search(name, sources, query, max_results, max_total):
+    """Rank every source in one unified BM25 index, capping hits per source.
+
+    sources is a list of (label, filepath, search_cols, output_cols). IDF and
+    document lengths are computed over the union of all files, so scores are
+    comparable across sources and results are globally ranked.
+
+    Returns (label, row) hits, the labels searched and the query corrections.
+    """
+    sources = [s for s in sources if Path(s[1]).exists()]
+    if not sources:
+        return [], [], {}
+    index = _compiled_index(name, [(label, filepath, cols) for label, filepath, cols, _ in sources])
+    scores = index["_bm25"]._accumulate(query)
+    ranked = sorted((idx for idx, score in scores.items() if score > 0),
+                    key=lambda idx: (-scores[idx], idx))
+    starts = index["_starts"]
+    taken, hits = defaultdict(int), []
+    for doc in ranked:
+        label = index["parts"][bisect_right(starts, doc) - 1]["label"]
+        if taken[label] >= max_results:
+            continue
+        taken[label] += 1
+        hits.append(doc)
+        if max_total is not None and len(hits) >= max_total:
+            break
+
+    output_cols = {label: cols for label, _, _, cols in sources}
+    results = [(part["label"], row) for part, row in _read_rows(index, hits, output_cols)]
+    return results, [label for label, _, _, _ in sources], index["_bm25"].corrections(query)
+
+
+def search_all(query, max_results=MAX_RESULTS, max_total=None):
+    """Search every CSV_CONFIG domain in one pass (``--domain all``).
+
+    Results are globally ranked with at most max_results per domain; each
+    row gets a leading "Domain" field.
+    """
+    sources = [(domain, DATA_DIR / config["file"], config["search_cols"], config["output_cols"])
+               for domain, config in CSV_CONFIG.items()]
+    hits, searched, corrections = _federated_search("_all_domains", sources, query, max_results, max_total)
+    results = [{"Domain": domain, **row} for domain, row in hits]
+    result = {
+        "domain": ALL,
+        "query": query,
+        "file": f"{len(searched)} domain files",
+        "domains": searched,
+        "count": len(results),
+        "results": results
+    }
+    if corrections:
+        result["corrections"] = corrections
+    return result
+
+
+def search_all_stacks(query, max_results=MAX_RESULTS, max_total=None):
+    """Search every stack guideline file in one pass (``--stack all``).
+
+    Results are globally ranked with at most max_results per stack; each
+    row gets a leading "Stack" field.
+    """
+    sources = [(stack, DATA_DIR / config["file"], _STACK_COLS["search_cols"], _STACK_COLS["output_cols"])
+               for stack, config in STACK_CONFIG.items()]
+    hits, searched, corrections = _federated_search("_all_stacks", sources, query, max_results, max_total)
+    results = [{"Stack": stack, **row} for stack, row in hits]
+    result = {
+        "domain": "stack",
+        "stack": ALL,
+        "query": query,
+        "file": f"{len(searched)} stack files",
+        "stacks": searched,
+        "count": len(results),
+        "results": results
     }
+    if corrections:
+        result["corrections"] = corrections
+    return result
@@ -14,16 +14,37 @@ Usage:
 """
 
 import csv
+import hashlib
 import json
 import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from core import search, DATA_DIR
+
+from core import search, search_many, warm, cached, file_digest, CSV_CONFIG, DATA_DIR, INDEX_DIR_NAME
 
 
 # ============ CONFIGURATION ============
 REASONING_FILE = "ui-reasoning.csv"
 
+# generate() results are memoized here, keyed by query + data file hashes;
+# beyond GENERATE_CACHE_MAX entries the least recently used are evicted
+GENERATE_CACHE_DIR = DATA_DIR / INDEX_DIR_NAME / "design-system"
+GENERATE_CACHE_VERSION = 1
+GENERATE_CACHE_MAX = 256
+
+# Per-page searches used by page overrides: domain -> max_results
+PAGE_SEARCH_CONFIG = {
+    "style": 1,
+    "ux": 3,
+    "landing": 1
+}
+
+# "Generated: <timestamp>" lines are ignored when deciding whether a file changed
+GENERATED_LINE = re.compile(r'^.*\*\*Generated:\*\*.*$', re.MULTILINE)
+
 SEARCH_CONFIG = {
     "product": {"max_results": 1},
     "style": {"max_results": 3},
@@ -38,50 +59,51 @@ class DesignSystemGenerator:
     """Generates design system recommendations from aggregated searches."""
 
     def __init__(self):
-        self.reasoning_data = self._load_reasoning()
+        self.reasoning_index = self._load_reasoning()
+        self.reasoning_data = self.reasoning_index["rules"]
 
-    def _load_reasoning(self) -> list:
-        """Load reasoning rules from CSV."""
+    def _load_reasoning(self) -> dict:
+        """Load the compiled reasoning-rule index (cached next to the search indexes)."""
         filepath = DATA_DIR / REASONING_FILE
         if not filepath.exists():
-            return []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
-
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
-        results = {}
-        for domain, config in SEARCH_CONFIG.items():
-            if domain == "style" and style_priority:
-                # For style, also search with priority keywords
-                priority_query = " ".join(style_priority[:2]) if style_priority else query
-                combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
-            else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
+            return _compile_reasoning([])
+        return cached("ui-reasoning.rules", filepath, _build_reasoning_index)
+
+    def _domain_query(self, query: str, domain: str, style_priority: list = None) -> str:
+        """Query sent to a domain; style also searches with priority keywords."""
+        if domain == "style" and style_priority:
+            priority_query = " ".join(style_priority[:2])
+            return f"{query} {priority_query}"
+        return query
 
     def _find_reasoning_rule(self, category: str) -> dict:
-        """Find matching reasoning rule for a category."""
+        """Find matching reasoning rule for a category.
+
+        Same precedence as a linear scan of the rules: exact match, then the
+        first rule whose category contains or is contained in ours, then the
+        first rule with a category keyword inside ours.
+        """
+        index = self.reasoning_index
+        rules = index["rules"]
         category_lower = category.lower()
 
         # Try exact match first
-        for rule in self.reasoning_data:
-            if rule.get("UI_Category", "").lower() == category_lower:
-                return rule
-
-        # Try partial match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            if ui_cat in category_lower or category_lower in ui_cat:
-                return rule
+        if category_lower in index["exact"]:
+            return rules[index["exact"][category_lower]]
+
+        # Try partial match: rule category inside ours, or ours inside a rule category
+        best = _first_substring_hit(category_lower, index["exact"], index["exact_lengths"])
+        pos = index["blob"].find(category_lower)
+        if pos >= 0:
+            contained = bisect_right(index["starts"], pos) - 1
+            best = contained if best is None else min(best, contained)
+        if best is not None:
+            return rules[best]
 
         # Try keyword match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            keywords = ui_cat.replace("/", " ").replace("-", " ").split()
-            if any(kw in category_lower for kw in keywords):
-                return rule
+        best = _first_substring_hit(category_lower, index["keywords"], index["keyword_lengths"])
+        if best is not None:
+            return rules[best]
 
         return {}
 
@@ -160,22 +182,92 @@ class DesignSystemGenerator:
         """Extract results list from search result dict."""
         return search_result.get("results", [])
 
-    def generate(self, query: str, project_name: str = None) -> dict:
-        """Generate complete design system recommendation."""
-        # Step 1: First search product to get category
-        product_result = search(query, "product", 1)
-        product_results = product_result.get("results", [])
-        category = "General"
-        if product_results:
-            category = product_results[0].get("Product Type", "General")
+    def _cache_key(self, query: str) -> str:
+        """Cache key: normalized query + content hashes of every input file."""
+        files = [DATA_DIR / CSV_CONFIG[domain]["file"] for domain in SEARCH_CONFIG]
+        files.append(DATA_DIR / REASONING_FILE)
+        parts = [str(GENERATE_CACHE_VERSION), " ".join(query.lower().split())]
+        parts += [f"{f.name}:{file_digest(f) if f.exists() else '-'}" for f in files]
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _load_cached(self, key: str):
+        path = GENERATE_CACHE_DIR / f"{key}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                design_system = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return design_system
+
+    def _store_cached(self, key: str, design_system: dict):
+        """Write atomically; an unwritable data dir just disables the cache."""
+        try:
+            GENERATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            path = GENERATE_CACHE_DIR / f"{key}.json"
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(design_system, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._evict_cached()
+
+    def _evict_cached(self):
+        """Drop least recently used entries beyond GENERATE_CACHE_MAX."""
+        entries = []
+        for path in GENERATE_CACHE_DIR.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for _, path in entries[GENERATE_CACHE_MAX:]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def generate(self, query: str, project_name: str = None, use_cache: bool = True) -> dict:
+        """Generate complete design system recommendation.
+
+        Results are memoized on disk per normalized query; the cache entry is
+        ignored as soon as any underlying CSV changes.
+        """
+        key = self._cache_key(query) if use_cache else None
+        design_system = self._load_cached(key) if key else None
+        if design_system is None:
+            design_system = self._generate(query)
+            if key:
+                self._store_cached(key, design_system)
+        return {"project_name": project_name or query.upper(), **design_system}
+
+    def _generate(self, query: str) -> dict:
+        """Run the searches and reasoning behind generate() (uncached)."""
+        warm(SEARCH_CONFIG)
+        with ThreadPoolExecutor(max_workers=len(SEARCH_CONFIG)) as pool:
+            # Step 1: Search every domain that does not depend on the product category
+            futures = {
+                domain: pool.submit(search, query, domain, config["max_results"])
+                for domain, config in SEARCH_CONFIG.items() if domain != "style"
+            }
+            product_result = futures["product"].result()
+            product_results = product_result.get("results", [])
+            category = "General"
+            if product_results:
+                category = product_results[0].get("Product Type", "General")
 
-        # Step 2: Get reasoning rules for this category
-        reasoning = self._apply_reasoning(category, {})
-        style_priority = reasoning.get("style_priority", [])
+            # Step 2: Get reasoning rules for this category
+            reasoning = self._apply_reasoning(category, {})
+            style_priority = reasoning.get("style_priority", [])
 
-        # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
-        search_results["product"] = product_result  # Reuse product search
+            # Step 3: Style search with style priority hints
+            futures["style"] = pool.submit(search, self._domain_query(query, "style", style_priority),
+                                           "style", SEARCH_CONFIG["style"]["max_results"])
+            search_results = {domain: future.result() for domain, future in futures.items()}
 
         # Step 4: Select best matches from each domain using priority
         style_results = self._extract_results(search_results.get("style", {}))
@@ -195,7 +287,6 @@ class DesignSystemGenerator:
         combined_effects = style_effects if style_effects else reasoning_effects
 
         return {
-            "project_name": project_name or query.upper(),
             "category": category,
             "pattern": {
                 "name": best_landing.get("Pattern Name", reasoning.get("pattern", "Hero + Features + CTA")),
@@ -236,6 +327,59 @@ class DesignSystemGenerator:
         }
 
 
+# ============ REASONING INDEX ============
+def _build_reasoning_index(filepath) -> dict:
+    """Parse ui-reasoning.csv into lookup tables (see _compile_reasoning)."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return _compile_reasoning(list(csv.DictReader(f)))
+
+
+def _compile_reasoning(rules: list) -> dict:
+    """Build lookup tables over reasoning rules.
+
+    - exact: lowercased UI_Category -> first rule index
+    - keywords: category keyword -> first rule index
+    - blob/starts: all categories joined by NUL, so "ours inside theirs" is a
+      single str.find() and bisect maps the hit back to its rule
+    Substrings of the query category are only probed at lengths that occur
+    in the tables, so lookups stay flat as the rule count grows.
+    """
+    exact, keywords, names = {}, {}, []
+    for idx, rule in enumerate(rules):
+        ui_cat = rule.get("UI_Category", "").lower()
+        names.append(ui_cat)
+        exact.setdefault(ui_cat, idx)
+        for kw in ui_cat.replace("/", " ").replace("-", " ").split():
+            keywords.setdefault(kw, idx)
+
+    starts, pos = [], 0
+    for name in names:
+        starts.append(pos)
+        pos += len(name) + 1
+    return {
+        "rules": rules,
+        "exact": exact,
+        "exact_lengths": sorted({len(k) for k in exact}),
+        "keywords": keywords,
+        "keyword_lengths": sorted({len(k) for k in keywords}),
+        "blob": "\0".join(names),
+        "starts": starts,
+    }
+
+
+def _first_substring_hit(text: str, table: dict, lengths: list):
+    """Smallest table value whose key occurs as a substring of text, or None."""
+    best = None
+    for length in lengths:
+        if length > len(text):
+            break
+        for start in range(len(text) - length + 1):
+            idx = table.get(text[start:start + length])
+            if idx is not None and (best is None or idx < best):
+                best = idx
+    return best
+
+
 # ============ OUTPUT FORMATTERS ============
 BOX_WIDTH = 90  # Wider box for more content
 
@@ -460,7 +604,8 @@ def format_markdown(design_system: dict) -> str:
 
 # ============ MAIN ENTRY POINT ============
 def generate_design_system(query: str, project_name: str = None, output_format: str = "ascii", 
-                           persist: bool = False, page: str = None, output_dir: str = None) -> str:
+                           persist: bool = False, page: str = None, output_dir: str = None,
+                           use_cache: bool = True, pages: list = None) -> str:
     """
     Main entry point for design system generation.
 
@@ -471,16 +616,18 @@ def generate_design_system(query: str, project_name: str = None, output_format:
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        use_cache: Reuse a memoized result for the same query and data files
+        pages: Optional list of page names; all overrides are generated in one run
 
     Returns:
         Formatted design system string
     """
     generator = DesignSystemGenerator()
-    design_system = generator.generate(query, project_name)
+    design_system = generator.generate(query, project_name, use_cache)
     
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
+        persist_design_system(design_system, page, output_dir, query, pages)
 
     if output_format == "markdown":
         return format_markdown(design_system)
@@ -488,7 +635,8 @@ def generate_design_system(query: str, project_name: str = None, output_format:
 
 
 # ============ PERSISTENCE FUNCTIONS ============
-def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None) -> dict:
+def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None,
+                          pages: list = None) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
     
@@ -497,9 +645,11 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        pages: Optional list of page names; their searches are batched and the
+            override files are rendered in parallel
     
     Returns:
-        dict with created file paths and status
+        dict with created file paths, unchanged file paths and status
     """
     base_dir = Path(output_dir) if output_dir else Path.cwd()
     
@@ -511,41 +661,64 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
     pages_dir = design_system_dir / "pages"
     
     created_files = []
+    unchanged_files = []
+
+    def write(path: Path, content: str):
+        if _write_if_changed(path, content):
+            created_files.append(str(path))
+        else:
+            unchanged_files.append(str(path))
     
     # Create directories
     design_system_dir.mkdir(parents=True, exist_ok=True)
     pages_dir.mkdir(parents=True, exist_ok=True)
     
-    master_file = design_system_dir / "MASTER.md"
-    
     # Generate and write MASTER.md
-    master_content = format_master_md(design_system)
-    with open(master_file, 'w', encoding='utf-8') as f:
-        f.write(master_content)
-    created_files.append(str(master_file))
+    write(design_system_dir / "MASTER.md", format_master_md(design_system))
     
-    # If page is specified, create page override file with intelligent content
-    if page:
-        page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, 'w', encoding='utf-8') as f:
-            f.write(page_content)
-        created_files.append(str(page_file))
+    # Page override files with intelligent content
+    slugs = {}
+    for name in ([page] if page else []) + list(pages or []):
+        slugs.setdefault(name.lower().replace(' ', '-'), name)
+    page_names = list(slugs.values())
+    if page_names:
+        searches = _page_searches([_page_context(name, page_query) for name in page_names])
+        with ThreadPoolExecutor(max_workers=min(8, len(page_names))) as pool:
+            contents = list(pool.map(
+                lambda name: format_page_override_md(design_system, name, page_query, searches),
+                page_names))
+        for name, content in zip(page_names, contents):
+            write(pages_dir / f"{name.lower().replace(' ', '-')}.md", content)
     
     # Create tailwind.config.js
-    tailwind_file = design_system_dir / "tailwind.config.js"
-    tailwind_content = format_tailwind_config(design_system)
-    with open(tailwind_file, 'w', encoding='utf-8') as f:
-        f.write(tailwind_content)
-    created_files.append(str(tailwind_file))
+    write(design_system_dir / "tailwind.config.js", format_tailwind_config(design_system))
 
     return {
         "status": "success",
         "design_system_dir": str(design_system_dir),
-        "created_files": created_files
+        "created_files": created_files,
+        "unchanged_files": unchanged_files
     }
 
 
+def _write_if_changed(path: Path, content: str) -> bool:
+    """Write content unless the file already holds it (timestamps aside).
+
+    Returns True if the file was written.
+    """
+    new_hash = hashlib.sha1(GENERATED_LINE.sub("", content).encode("utf-8")).hexdigest()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            old_hash = hashlib.sha1(GENERATED_LINE.sub("", f.read()).encode("utf-8")).hexdigest()
+    except (OSError, UnicodeDecodeError):
+        old_hash = None
+    if old_hash == new_hash:
+        return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
 def format_tailwind_config(design_system: dict) -> str:
     """Format design system as tailwind.config.js."""
     colors = design_system.get("colors", {})
@@ -845,14 +1018,19 @@ def format_master_md(design_system: dict) -> str:
     return "\n".join(lines)
 
 
-def format_page_override_md(design_system: dict, page_name: str, page_query: str = None) -> str:
-    """Format a page-specific override file with intelligent AI-generated content."""
+def format_page_override_md(design_system: dict, page_name: str, page_query: str = None,
+                            searches: dict = None) -> str:
+    """Format a page-specific override file with intelligent AI-generated content.
+
+    searches optionally maps page context -> precomputed page searches
+    (see _page_searches) so batched pages skip their own lookups.
+    """
     project = design_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
     
     # Detect page type and generate intelligent overrides
-    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system)
+    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system, searches)
     
     lines = []
     
@@ -954,28 +1132,52 @@ def format_page_override_md(design_system: dict, page_name: str, page_query: str
     return "\n".join(lines)
 
 
-def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict) -> dict:
+def _page_context(page_name: str, page_query: str = None) -> str:
+    """Search context for a page: its name plus the project query."""
+    return f"{page_name.lower()} {(page_query or '').lower()}"
+
+
+def _page_searches(contexts: list) -> dict:
+    """Run the page-override searches for many page contexts at once.
+
+    Duplicate contexts are searched once and every domain scores the whole
+    batch in a single search_many() call.
+
+    Returns:
+        dict mapping context -> {domain: search result}
+    """
+    unique = list(dict.fromkeys(contexts))
+    batched = {context: {} for context in unique}
+    for domain, max_results in PAGE_SEARCH_CONFIG.items():
+        for context, result in zip(unique, search_many(unique, domain, max_results)):
+            batched[context][domain] = result[domain]
+    return batched
+
+
+def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict,
+                                    searches: dict = None) -> dict:
     """
     Generate intelligent overrides based on page type using layered search.
     
     Uses the existing search infrastructure to find relevant style, UX, and layout
     data instead of hardcoded page types.
     """
-    from core import search
-    
-    page_lower = page_name.lower()
-    query_lower = (page_query or "").lower()
-    combined_context = f"{page_lower} {query_lower}"
+    combined_context = _page_context(page_name, page_query)
     
     # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    if searches and combined_context in searches:
+        page_search = searches[combined_context]
+    else:
+        warm(PAGE_SEARCH_CONFIG)
+        with ThreadPoolExecutor(max_workers=len(PAGE_SEARCH_CONFIG)) as pool:
+            futures = {domain: pool.submit(search, combined_context, domain, max_results=max_results)
+                       for domain, max_results in PAGE_SEARCH_CONFIG.items()}
+            page_search = {domain: future.result() for domain, future in futures.items()}
     
     # Extract results from search response
-    style_results = style_search.get("results", [])
-    ux_results = ux_search.get("results", [])
-    landing_results = landing_search.get("results", [])
+    style_results = page_search["style"].get("results", [])
+    ux_results = page_search["ux"].get("results", [])
+    landing_results = page_search["landing"].get("results", [])
     
     # Detect page type from search results or context
     page_type = _detect_page_type(combined_context, style_results)
@@ -1103,8 +1305,9 @@ if __name__ == "__main__":
     parser.add_argument("query", help="Search query (e.g., 'SaaS dashboard')")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name")
     parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format")
+    parser.add_argument("--no-cache", action="store_false", dest="use_cache", help="Ignore memoized results")
 
     args = parser.parse_args()
 
-    result = generate_design_system(args.query, args.project_name, args.format)
+    result = generate_design_system(args.query, args.project_name, args.format, use_cache=args.use_cache)
     print(result)
@@ -3,8 +3,11 @@
 """
 UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
+       python search.py "<query>" --domain all      # every domain, globally ranked
+       python search.py "<query>" --stack all       # every stack, globally ranked
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py "<query>" --design-system --persist [-p "Project Name"] --pages "home,pricing,checkout"
 
 Domains: style, prompt, color, chart, landing, product, ux, typography
 Stacks: html-tailwind, react, nextjs
@@ -12,13 +15,14 @@ Stacks: html-tailwind, react, nextjs
 Persistence (Master + Overrides pattern):
   --persist    Save design system to design-system/MASTER.md
   --page       Also create a page-specific override file in design-system/pages/
+  --pages      Create several page overrides in one run (comma-separated)
 """
 
 import argparse
 import sys
 import io
 import os
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
+from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, ALL, search, search_stack
 from design_system import generate_design_system, persist_design_system
 
 # Force UTF-8 for stdout/stderr to handle emojis on Windows (cp1252 default)
@@ -41,6 +45,9 @@ def format_output(result):
         output.append(f"## UI Pro Max Search Results")
         output.append(f"**Domain:** {result['domain']} | **Query:** {result['query']}")
     output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
+    if result.get("corrections"):
+        fixes = ", ".join(f"{token} → {'/'.join(terms)}" for token, terms in result["corrections"].items())
+        output.append(f"**Matched as:** {fixes}\n")
 
     for i, row in enumerate(result['results'], 1):
         output.append(f"### Result {i}")
@@ -82,19 +89,21 @@ def load_context():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
     parser.add_argument("query", nargs="?", help="Search query")
-    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
-    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search")
-    parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results")
+    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()) + [ALL], help="Search domain ('all' = every domain)")
+    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS + [ALL], help="Stack-specific search ('all' = every stack)")
+    parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (per domain/stack with 'all')")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
     
     # Design system
     parser.add_argument("--design-system", "-ds", action="store_true", help="Generate design system")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name")
     parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format")
+    parser.add_argument("--no-cache", action="store_false", dest="use_cache", help="Regenerate instead of reusing a memoized design system")
     
     # Persistence
     parser.add_argument("--persist", action="store_true", help="Save to design-system/MASTER.md")
     parser.add_argument("--page", type=str, default=None, help="Page override")
+    parser.add_argument("--pages", type=str, default=None, help="Comma-separated page overrides, generated in one run")
     parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory")
     
     # Context
@@ -121,6 +130,8 @@ if __name__ == "__main__":
     if args.save_context:
         save_context(args)
 
+    pages = list(dict.fromkeys(p.strip() for p in args.pages.split(",") if p.strip())) if args.pages else []
+
     # Design system takes priority
     if args.design_system:
         result = generate_design_system(
@@ -129,7 +140,9 @@ if __name__ == "__main__":
             args.format,
             persist=args.persist,
             page=args.page,
-            output_dir=args.output_dir
+            output_dir=args.output_dir,
+            use_cache=args.use_cache,
+            pages=pages
         )
         print(result)
         
@@ -139,8 +152,8 @@ if __name__ == "__main__":
             print(f"✅ Design system persisted to design-system/{project_slug}/")
             print(f"   📄 MASTERT.md")
             print(f"   🎨 tailwind.config.js (Auto-generated)")
-            if args.page:
-                print(f"   📄 pages/{args.page}.md")
+            for page in ([args.page] if args.page else []) + [p for p in pages if p != args.page]:
+                print(f"   📄 pages/{page}.md")
             print("=" * 60)
 
     # Stack search